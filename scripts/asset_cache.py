@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Processed Asset Cache
+
+Caches cleaned and resized logos in memory and on disk. Entries are keyed by
+the source file's SHA-256 plus every processing parameter, so a repeat
+render with the same logo at the same size skips the decode, crop, chroma
+key and resize entirely. The key also covers the processing code itself
+(`_process` and the chroma_key module), so changing either invalidates the
+disk cache instead of serving logos processed the old way.
+"""
+
+from PIL import Image
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+import chroma_key
+import profiling
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', '.cache', 'logos')
+
+_memory = {}
+_digests = {}
+_lock = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-256 of a file, memoized until its mtime or size changes."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = os.path.abspath(path)
+    cached = _digests.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _digests[key] = (stamp, digest)
+    return digest
+
+
+@functools.lru_cache(maxsize=None)
+def _process_hash():
+    """Hash of the code that processes a logo."""
+    h = hashlib.sha256()
+    h.update(inspect.getsource(_process).encode())
+    h.update(inspect.getsource(chroma_key).encode())
+    return h.hexdigest()
+
+
+def _cache_key(source, size, crop, keys, softness):
+    params = {
+        'process': _process_hash(),
+        'source': file_digest(source),
+        'size': list(size) if size is not None else None,
+        'crop': list(crop) if crop is not None else None,
+        'keys': [[list(color[:3]), threshold] for color, threshold in keys],
+        'softness': softness,
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _process(source, size, crop, keys, softness):
+    img = Image.open(source).convert('RGBA')
+    if crop is not None:
+        # Crop boxes are fractions of the source size
+        w, h = img.size
+        left, top, right, bottom = crop
+        img = img.crop((int(w * left), int(h * top), int(w * right), int(h * bottom)))
+    if keys:
+        img = chroma_key.key_out(img, keys, softness)
+    if size is not None:
+        img = img.resize(tuple(size), Image.Resampling.LANCZOS)
+    return img
+
+
+def processed_logo(source, size=None, crop=None, keys=(), softness=0):
+    """Return `source` cropped, chroma-keyed and resized, using the cache.
+
+    The returned image is shared between callers, so treat it as read-only.
+    """
+    key = _cache_key(source, size, crop, keys, softness)
+    with _lock:
+        if key in _memory:
+            return _memory[key]
+
+    path = os.path.join(CACHE_DIR, f'{key}.png')
+    if os.path.exists(path):
+        with profiling.stage('logo', source=os.path.basename(source), cache='disk'):
+            img = Image.open(path)
+            img.load()
+    else:
+        with profiling.stage('logo', source=os.path.basename(source), cache='miss'):
+            img = _process(source, size, crop, keys, softness)
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # Write then rename so parallel workers never see a partial file
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            img.save(tmp_path, 'PNG')
+            os.replace(tmp_path, path)
+
+    with _lock:
+        _memory[key] = img
+    return img
+
+
+def clear_memory_cache():
+    """Forget in-memory entries; the disk cache is left alone."""
+    with _lock:
+        _memory.clear()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Batch Skin Renderer
+
+Renders every skin listed in a JSON or TOML spec file across a process pool.
+
+Spec format (JSON shown, TOML uses ``[[skins]]`` tables):
+
+    {
+      "output_dir": "skins",
+      "skins": [
+        {"generator": "create_stripes",
+         "output_name": "usa_stripes",
+         "params": {"colors": [[255, 0, 0, 255], [255, 255, 255, 255]], "stripe_width": 60}}
+      ]
+    }
+
+Usage: python batch_render.py SPEC [--workers N] [--output-dir DIR] [--all-trims]
+                               [--dry-run] [--force] [--trace PATH [--trace-allocations]]
+                               [--low-memory] [--memory-budget MB]
+
+Skins whose inputs are unchanged since the last build are skipped.
+
+--low-memory renders in render.py's single-buffer mode. --memory-budget
+caps the number of workers, and so the renders in flight at once, to what
+fits the budget by a rough per-worker estimate.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PIL import Image
+import argparse
+import json
+import os
+import sys
+import time
+
+import build_manifest
+import ferrari_f1
+import ferrari_f1_sponsors
+import generate_skin
+import png_encoder
+import profiling
+import render
+import template_cache
+
+GENERATOR_MODULES = (generate_skin, ferrari_f1, ferrari_f1_sponsors)
+
+# Peak memory of a worker: interpreter and libraries, then per template its
+# decoded image, masks and panel index, plus one render in flight. Fitted to
+# the peak RSS of a worker that ran every generator (all textures, patterns,
+# panel fills and personalized liveries) at 1024 px: 97 MB for one template,
+# 118 MB for all three trims, low-memory mode included
+WORKER_BASE_BYTES = 40 * 2**20
+TEMPLATE_BYTES_PER_PIXEL = 12
+RENDER_BYTES_PER_PIXEL = 48
+
+
+def available_generators():
+    """Map every create_* function name to its function."""
+    generators = {}
+    for module in GENERATOR_MODULES:
+        for name in dir(module):
+            if name.startswith('create_'):
+                generators[name] = getattr(module, name)
+    return generators
+
+
+def tuplify(value):
+    """Turn lists of numbers (from JSON or TOML) into tuples so PIL accepts them as colors."""
+    if isinstance(value, list):
+        items = [tuplify(item) for item in value]
+        if items and all(isinstance(item, (int, float)) for item in items):
+            return tuple(items)
+        return items
+    if isinstance(value, dict):
+        return {key: tuplify(item) for key, item in value.items()}
+    return value
+
+
+def load_spec(path):
+    """Read a batch spec and return (output_dir, list of skin entries).
+
+    TOML specs need Python 3.11+ (tomllib); JSON works everywhere. Raises
+    ValueError for a malformed spec.
+    """
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError(f'{path}: TOML specs need Python 3.11 or newer; use JSON') from None
+        with open(path, 'rb') as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path) as f:
+            spec = json.load(f)
+
+    output_dir = spec.get('output_dir')
+    if output_dir is not None and not os.path.isabs(output_dir):
+        output_dir = os.path.join(os.path.dirname(os.path.abspath(path)), output_dir)
+
+    generators = available_generators()
+    skins = []
+    # Output file -> index of the skin that writes it; two skins writing
+    # the same file would race in parallel workers
+    outputs = {}
+    for index, entry in enumerate(spec.get('skins', [])):
+        name = entry.get('generator')
+        if name not in generators:
+            raise ValueError(f'Skin #{index}: unknown generator {name!r}')
+        params = tuplify(entry.get('params', {}))
+        if 'output_name' in entry:
+            params['output_name'] = entry['output_name']
+        try:
+            output_paths, _ = build_manifest.describe(generators[name], params, output_dir)
+        except TypeError as exc:
+            raise ValueError(f'Skin #{index}: bad params for {name}: {exc}') from None
+        for output_path in output_paths:
+            if output_path in outputs:
+                raise ValueError(f'Skin #{index}: output {output_path} is also written by skin '
+                                 f'#{outputs[output_path]}; give each skin a unique output_name')
+            outputs[output_path] = index
+        skins.append({'generator': name, 'params': params})
+    return output_dir, skins
+
+
+def worker_bytes(template_paths):
+    """Estimated peak memory of one worker rendering against `template_paths`."""
+    pixels = []
+    for path in template_paths:
+        # Only the header is read
+        with Image.open(path) as template:
+            pixels.append(template.width * template.height)
+    return (WORKER_BASE_BYTES + TEMPLATE_BYTES_PER_PIXEL * sum(pixels)
+            + RENDER_BYTES_PER_PIXEL * max(pixels))
+
+
+def workers_for_budget(memory_budget, all_trims=False, workers=None):
+    """Number of workers (at least 1, at most `workers` or the CPU count) that fit in `memory_budget` bytes."""
+    if all_trims:
+        template_paths = template_cache.available_templates()
+    else:
+        template_paths = sorted({os.path.abspath(module.TEMPLATE_PATH) for module in GENERATOR_MODULES})
+    fit = max(1, memory_budget // worker_bytes(template_paths))
+    return min(fit, workers or os.cpu_count() or 1)
+
+
+def _init_worker(output_dir, all_trims=False, trace=None, low_memory=False):
+    """Point the generators at the batch output folder and warm the templates.
+
+    `trace` is None, or the allocation-tracing flag to enable profiling with.
+    """
+    render.set_low_memory(low_memory)
+    if trace is not None:
+        profiling.enable(trace_allocations=trace)
+    for module in GENERATOR_MODULES:
+        if output_dir is not None:
+            module.OUTPUT_DIR = output_dir
+        template_cache.get_template(module.TEMPLATE_PATH)
+    if all_trims:
+        render.set_target_templates(template_cache.available_templates())
+        for path in render.TARGET_TEMPLATES:
+            template_cache.get_template(path)
+
+
+def _render(skin):
+    """Render one skin; never raises so one bad entry cannot sink the batch."""
+    start = time.perf_counter()
+    try:
+        path = available_generators()[skin['generator']](**skin['params'])
+        result = {'status': 'ok', 'path': path, 'seconds': time.perf_counter() - start,
+                  'encode': png_encoder.last_stats()}
+    except Exception as exc:
+        result = {'status': 'error', 'error': f'{type(exc).__name__}: {exc}',
+                  'seconds': time.perf_counter() - start}
+    result['events'] = profiling.drain() if profiling.ENABLED else []
+    return result
+
+
+def run_batch(skins, output_dir=None, workers=None, all_trims=False, trace=None, low_memory=False):
+    """Render `skins` in a process pool and yield (skin, result) as each finishes.
+
+    With `all_trims` each design is drawn once and written for every template.
+    With `trace` set (to the allocation-tracing flag) workers record profiling
+    events and return them in each result's "events". `low_memory` switches
+    the workers to the single-buffer render mode.
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(output_dir, all_trims, trace, low_memory)) as pool:
+        futures = {pool.submit(_render, skin): skin for skin in skins}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def render_skins(skins, output_dir=None, workers=None, all_trims=False, dry_run=False, force=False,
+                 trace_path=None, trace_allocations=False, low_memory=False, memory_budget=None):
+    """Render the skins that are out of date, report progress, and return an exit status.
+
+    `memory_budget` (bytes) caps the worker count; see workers_for_budget.
+    """
+    # Work out which skins are stale before starting any workers
+    generators = available_generators()
+    template_paths = template_cache.available_templates() if all_trims else None
+    manifest = build_manifest.Manifest()
+    stale = []
+    for skin in skins:
+        build = build_manifest.describe(generators[skin['generator']], skin['params'],
+                                        output_dir, template_paths)
+        if force or not manifest.is_fresh(*build):
+            stale.append((skin, build))
+
+    if dry_run:
+        for skin, (output_paths, _) in stale:
+            for path in output_paths:
+                print(f'Would rebuild: {path}')
+        print(f'{len(stale)} of {len(skins)} skins out of date')
+        return 0
+
+    if memory_budget is not None:
+        workers = workers_for_budget(memory_budget, all_trims, workers)
+        print(f'Memory budget {memory_budget / 2**20:.0f} MB: {workers} workers')
+    print(f'Rendering {len(stale)} skins ({len(skins) - len(stale)} up to date)...')
+    builds = {id(skin): build for skin, build in stale}
+    start = time.perf_counter()
+    failures = 0
+    events = []
+    trace = trace_allocations if trace_path else None
+    try:
+        for skin, result in run_batch([skin for skin, _ in stale], output_dir, workers,
+                                      all_trims, trace, low_memory):
+            events.extend(result['events'])
+            label = skin['params'].get('output_name', skin['generator'])
+            if result['status'] == 'ok':
+                manifest.record(*builds[id(skin)])
+                encode = result['encode'] or {}
+                size = f", {encode['bytes'] / 1024:.0f} KB, encode {encode['seconds']:.2f}s" if encode else ''
+                print(f"  ok     {label} ({result['seconds']:.2f}s{size})")
+            else:
+                failures += 1
+                print(f"  FAILED {label} ({result['seconds']:.2f}s): {result['error']}")
+    finally:
+        manifest.save()
+        if trace_path:
+            profiling.write_trace(trace_path, events)
+            print(f'Trace written to {trace_path}')
+
+    elapsed = time.perf_counter() - start
+    print(f'\nDone! {len(stale) - failures} rendered, {failures} failed in {elapsed:.1f}s')
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render a batch of skins from a spec file.')
+    parser.add_argument('spec', help='JSON or TOML batch spec')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--output-dir', default=None, help='override the spec output folder')
+    parser.add_argument('--all-trims', action='store_true',
+                        help='render every skin for all templates, one folder per trim')
+    parser.add_argument('--dry-run', action='store_true', help='list the skins that would be rebuilt')
+    parser.add_argument('--force', action='store_true', help='rebuild every skin, even if up to date')
+    parser.add_argument('--trace', default=None,
+                        help='write per-stage profiling to this Chrome trace (.json) or JSON lines (.jsonl) file')
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help='also record peak traced memory and image buffer bytes per stage (slower)')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='draw into one reused canvas per worker and mask it in place')
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help='cap the workers to fit this much memory')
+    args = parser.parse_args(argv)
+
+    try:
+        output_dir, skins = load_spec(args.spec)
+    except ValueError as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 2
+    if args.output_dir is not None:
+        output_dir = args.output_dir
+    memory_budget = int(args.memory_budget * 2**20) if args.memory_budget is not None else None
+    return render_skins(skins, output_dir, args.workers, args.all_trims, args.dry_run, args.force,
+                        args.trace, args.trace_allocations, args.low_memory, memory_budget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
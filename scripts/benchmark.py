@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Skin Generator Benchmarks
+
+Runs every create_* generator at 512 and 1024 px and reports per-stage
+timings (template load, draw, mask composite, PNG encode) plus memory. Each
+generator runs in a freshly spawned worker process, so template loads are
+cold and the peak RSS belongs to that generator alone. Everything runs
+offline against the templates and assets in the repo.
+
+Memory columns, from one extra run with allocation tracing after the timed
+runs:
+
+- traced: the peak Python/NumPy memory of one render.
+- images: the bytes of Pillow image buffers it created.
+- rss: the worker's resident high-water mark.
+
+Usage: python benchmark.py [--sizes 512 1024] [--repeat 3] [--only NAME ...] [--low-memory]
+                           [--save-baseline] [--baseline PATH] [--threshold 0.25]
+
+Without --save-baseline the results are compared with the saved baseline and
+the exit status is 1 if any stage regressed by more than the threshold.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import PIL
+
+import batch_render
+import profiling
+import render
+import template_cache
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), '..', '.cache', 'benchmark_baseline.json')
+
+# Arguments for generators that have no defaults
+BENCH_PARAMS = {
+    'create_solid_color': {'color': (25, 25, 25, 255), 'output_name': 'solid_color'},
+    'create_gradient': {'color1': (0, 100, 200), 'color2': (100, 0, 150)},
+    'create_stripes': {'colors': [(255, 0, 0, 255), (255, 255, 255, 255), (0, 0, 255, 255)]},
+    'create_racing_stripes': {'base_color': (30, 30, 30, 255), 'stripe_color': (255, 255, 255, 255)},
+    'create_pattern': {'name': 'hex', 'rotation': 30},
+    'create_texture': {'name': 'camo', 'seed': 7},
+    'create_two_tone': {'base_color': (240, 240, 240, 255), 'accent_color': (20, 60, 160, 255)},
+}
+
+STAGES = ('template_load', 'draw', 'mask', 'encode', 'total')
+
+# Stage changes smaller than this are treated as noise
+MIN_REGRESSION_SECONDS = 0.002
+
+
+def _scaled_template(size, work_dir):
+    """Write the default template resampled to `size` and return its path."""
+    path = os.path.join(work_dir, f'template-{size}', 'template.png')
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        template = Image.open(template_cache.DEFAULT_TEMPLATE)
+        if template.size != (size, size):
+            template = template.resize((size, size), Image.Resampling.LANCZOS)
+        template.save(path, 'PNG')
+    return path
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _bench_one(name, template_path, output_dir, repeat, low_memory=False):
+    """Benchmark one generator in this (fresh) worker process."""
+    render.set_low_memory(low_memory)
+    for module in batch_render.GENERATOR_MODULES:
+        module.TEMPLATE_PATH = template_path
+        module.OUTPUT_DIR = output_dir
+    generator = batch_render.available_generators()[name]
+    params = BENCH_PARAMS.get(name, {})
+
+    rss_before = _peak_rss()
+
+    start = time.perf_counter()
+    template_cache.get_template(template_path)
+    template_load = time.perf_counter() - start
+
+    runs = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            generator(**params)
+            total = time.perf_counter() - start
+        timings = render.last_timings()
+        runs.append({
+            'draw': total - timings['mask'] - timings['encode'],
+            'mask': timings['mask'],
+            'encode': timings['encode'],
+            'total': total,
+        })
+
+    # Memory comes from a separate traced run so tracing does not skew the timings
+    profiling.enable(trace_allocations=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator(**params)
+    skin = [event for event in profiling.drain() if event['name'] == 'skin'][-1]
+    profiling.disable()
+
+    result = {stage: statistics.median(run[stage] for run in runs) for stage in ('draw', 'mask', 'encode', 'total')}
+    result['template_load'] = template_load
+    result['peak_rss_bytes'] = _peak_rss()
+    result['rss_growth_bytes'] = result['peak_rss_bytes'] - rss_before
+    result['traced_peak_bytes'] = skin['alloc_peak_bytes']
+    # Not counted on a Pillow without the hook profiling relies on
+    result['image_bytes'] = skin.get('image_bytes')
+    return result
+
+
+def run_benchmarks(sizes=(512, 1024), repeat=3, only=None, low_memory=False):
+    """Benchmark every generator at every size and return the results dict."""
+    names = sorted(batch_render.available_generators())
+    if only:
+        names = [name for name in names if name in only]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        templates = {size: _scaled_template(size, work_dir) for size in sizes}
+        # One task per freshly spawned process (a forked one would inherit this
+        # process's RSS high-water mark), run one at a time so timings do not contend
+        with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            for size in sizes:
+                for name in names:
+                    key = f'{name}@{size}'
+                    results[key] = pool.submit(_bench_one, name, templates[size], work_dir, repeat,
+                                               low_memory).result()
+                    print(_format_row(key, results[key]))
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'low_memory': low_memory,
+        },
+        'results': results,
+    }
+
+
+def _format_row(key, result):
+    stages = '  '.join(f'{stage} {result[stage] * 1000:7.1f}ms' for stage in STAGES)
+    images = f'{result["image_bytes"] / 2**20:5.1f}MB' if result['image_bytes'] is not None else '    n/a'
+    return (f'{key:42s} {stages}  traced {result["traced_peak_bytes"] / 2**20:5.1f}MB'
+            f'  images {images}  rss {result["peak_rss_bytes"] / 2**20:5.1f}MB')
+
+
+def find_regressions(current, baseline, threshold):
+    """List (key, metric, baseline, current) entries that got worse than `threshold`."""
+    regressions = []
+    for key, result in current['results'].items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        for stage in STAGES:
+            if (result[stage] > previous[stage] * (1 + threshold)
+                    and result[stage] - previous[stage] > MIN_REGRESSION_SECONDS):
+                regressions.append((key, stage, previous[stage], result[stage]))
+        if result['rss_growth_bytes'] > previous['rss_growth_bytes'] * (1 + threshold) + 2**20:
+            regressions.append((key, 'rss_growth_bytes', previous['rss_growth_bytes'], result['rss_growth_bytes']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every skin generator.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[512, 1024], help='template sizes in px')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per generator (median is reported)')
+    parser.add_argument('--only', nargs='+', default=None, help='only benchmark these generators')
+    parser.add_argument('--low-memory', action='store_true', help='render in the single-buffer low-memory mode')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown, e.g. 0.25 for 25%%')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, args.only, args.low_memory)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f'\nBaseline saved to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('\nNo baseline yet - run with --save-baseline to create one.')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline, args.threshold)
+    if not regressions:
+        print(f'\nNo regressions beyond {args.threshold:.0%} against {args.baseline}')
+        return 0
+
+    print(f'\n{len(regressions)} regressions beyond {args.threshold:.0%}:')
+    for key, metric, before, after in regressions:
+        print(f'  {key} {metric}: {before:.4g} -> {after:.4g}')
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Incremental Build Manifest
+
+Records what every output skin was built from - the generator, its
+parameters, and hashes of the template, the assets and the generator source
+(including the helper modules it imports) - so a rebuild only re-renders
+skins whose inputs changed.
+"""
+
+import glob
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+import asset_cache
+import render
+import template_cache
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(SCRIPTS_DIR, '..', '.cache', 'build_manifest.json')
+
+_source_hashes = {}
+
+
+def _local_modules(module, seen=None):
+    """`module` plus every module from scripts/ it imports, transitively."""
+    seen = {} if seen is None else seen
+    path = getattr(module, '__file__', None)
+    if path is None or os.path.dirname(os.path.abspath(path)) != SCRIPTS_DIR:
+        return seen
+    path = os.path.abspath(path)
+    if path in seen:
+        return seen
+    seen[path] = module
+    for value in list(vars(module).values()):
+        if inspect.ismodule(value):
+            _local_modules(value, seen)
+    return seen
+
+
+def source_hash(fn):
+    """Hash of the generator's module and every local module it depends on."""
+    module = sys.modules[fn.__module__]
+    key = os.path.abspath(module.__file__)
+    if key not in _source_hashes:
+        h = hashlib.sha256()
+        for path in sorted(_local_modules(module)):
+            h.update(os.path.basename(path).encode())
+            h.update(asset_cache.file_digest(path).encode())
+        _source_hashes[key] = h.hexdigest()
+    return _source_hashes[key]
+
+
+def generator_name(fn):
+    """Stable name for a generator, even when its script runs as __main__."""
+    module_name = os.path.splitext(os.path.basename(inspect.getsourcefile(fn)))[0]
+    return f'{module_name}.{fn.__qualname__}'
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value))
+
+
+def describe(fn, params, output_dir=None, template_paths=None):
+    """Return (output_paths, inputs) for one generator call.
+
+    `template_paths` defaults to the multi-template targets if set, else the
+    generator's own template.
+    """
+    module = sys.modules[fn.__module__]
+    bound = inspect.signature(fn).bind(**params)
+    bound.apply_defaults()
+    arguments = dict(bound.arguments)
+
+    output_dir = output_dir if output_dir is not None else module.OUTPUT_DIR
+    template_paths = template_paths or render.TARGET_TEMPLATES
+    if template_paths:
+        output_paths = [os.path.join(output_dir, template_cache.trim_name(path),
+                                     f"{arguments['output_name']}.png") for path in template_paths]
+    else:
+        template_paths = [module.TEMPLATE_PATH]
+        output_paths = [os.path.join(output_dir, f"{arguments['output_name']}.png")]
+
+    assets_dir = getattr(module, 'ASSETS_DIR', None)
+    assets = sorted(glob.glob(os.path.join(assets_dir, '*'))) if assets_dir else []
+
+    inputs = _jsonable({
+        'generator': generator_name(fn),
+        'params': arguments,
+        'templates': [asset_cache.file_digest(path) for path in template_paths],
+        'assets': {os.path.basename(path): asset_cache.file_digest(path) for path in assets},
+        'source': source_hash(fn),
+    })
+    return [os.path.abspath(path) for path in output_paths], inputs
+
+
+class Manifest:
+    """The JSON record of built outputs, keyed by absolute output path."""
+
+    def __init__(self, path=None):
+        self.path = path = path or MANIFEST_PATH
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def is_fresh(self, output_paths, inputs):
+        """True if every output exists unchanged and was built from `inputs`."""
+        for path in output_paths:
+            entry = self.entries.get(path)
+            if entry is None or entry['inputs'] != inputs or not os.path.exists(path):
+                return False
+            st = os.stat(path)
+            if [st.st_size, st.st_mtime_ns] != entry['output']:
+                return False
+        return True
+
+    def record(self, output_paths, inputs):
+        for path in output_paths:
+            st = os.stat(path)
+            self.entries[path] = {'inputs': inputs, 'output': [st.st_size, st.st_mtime_ns]}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def job(fn, *args, **kwargs):
+    """Package a generator call as (fn, params) for `build`."""
+    bound = inspect.signature(fn).bind(*args, **kwargs)
+    return fn, dict(bound.arguments)
+
+
+def build(jobs, dry_run=False, force=False):
+    """Run the generator calls in `jobs` whose inputs changed since the last build.
+
+    With `dry_run` nothing is rendered; the outputs that would be rebuilt are
+    listed instead. Returns the number of stale jobs.
+    """
+    manifest = Manifest()
+    stale = 0
+    try:
+        for fn, params in jobs:
+            output_paths, inputs = describe(fn, params)
+            if not force and manifest.is_fresh(output_paths, inputs):
+                continue
+            stale += 1
+            if dry_run:
+                for path in output_paths:
+                    print(f'Would rebuild: {path}')
+                continue
+            fn(**params)
+            manifest.record(output_paths, inputs)
+    finally:
+        if not dry_run:
+            manifest.save()
+
+    if stale == 0:
+        print('All skins are up to date.')
+    return stale
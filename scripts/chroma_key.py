@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Chroma Key
+
+Array-based background removal for logo assets.
+"""
+
+from PIL import Image
+import numpy as np
+
+# Keyed-out pixels become fully transparent white
+CLEAR_PIXEL = (255, 255, 255, 0)
+
+
+def key_out(img, keys, softness=0):
+    """Make every pixel close to one of the key colors transparent.
+
+    `keys` is a list of ``(color, threshold)`` pairs. A pixel matches a key
+    when each of its RGB channels differs from the key by less than the
+    threshold, which is the same test the old per-pixel loop used, so all
+    keys are applied in a single pass.
+
+    With `softness` > 0, pixels just outside the threshold keep their color
+    but have their alpha ramped up over the next `softness` levels, which
+    smooths the jagged edges left by a hard key.
+    """
+    rgba = np.array(img.convert('RGBA'))
+    rgb = rgba[..., :3].astype(np.int16)
+
+    keyed = np.zeros(rgba.shape[:2], dtype=bool)
+    coverage = np.ones(rgba.shape[:2], dtype=np.float32) if softness > 0 else None
+
+    for color, threshold in keys:
+        distance = np.abs(rgb - np.asarray(color[:3], dtype=np.int16)).max(axis=2)
+        keyed |= distance < threshold
+        if coverage is not None:
+            ramp = np.clip((distance - threshold) / float(softness), 0.0, 1.0)
+            np.minimum(coverage, ramp, out=coverage)
+
+    if coverage is not None:
+        rgba[..., 3] = (rgba[..., 3] * coverage + 0.5).astype(np.uint8)
+    rgba[keyed] = CLEAR_PIXEL
+
+    return Image.fromarray(rgba)
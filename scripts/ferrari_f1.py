@@ -3,8 +3,15 @@
 Ferrari F1 Livery Generator for Tesla Model Y
 """
 
-from PIL import Image, ImageDraw
+from PIL import ImageDraw
 import os
+import sys
+
+import build_manifest
+import glyphs
+import gradients
+import panels
+import render
 
 TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), '..', 'templates', 'modely-2025-premium', 'template.png')
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'skins')
@@ -17,24 +24,18 @@ FERRARI_WHITE = (255, 255, 255, 255)  # #FFFFFF
 FERRARI_GREEN = (0, 165, 81, 255)     # #00A551 - Italian flag green
 
 
-def load_template():
-    return Image.open(TEMPLATE_PATH).convert('RGBA')
-
-
 def create_ferrari_f1_classic(output_name='Ferrari_F1_Classic'):
     """Classic Ferrari F1 - dominant red with black accents and Italian flag stripe."""
-    template = load_template()
-    width, height = template.size
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
     # Create base red
-    result = Image.new('RGBA', (width, height), FERRARI_RED)
+    result = render.new_canvas((width, height), FERRARI_RED)
     draw = ImageDraw.Draw(result)
     
     # Add black lower section (gradient fade)
-    for y in range(int(height * 0.7), height):
-        ratio = (y - height * 0.7) / (height * 0.3)
-        alpha = int(255 * ratio * 0.8)
-        draw.line([(0, y), (width, y)], fill=(0, 0, 0, alpha))
+    fade_top = int(height * 0.7)
+    fade = gradients.linear_gradient((width, height - fade_top), [(0, 0, 0, 0), (0, 0, 0, 204)], angle=90)
+    result.paste(fade, (0, fade_top))
     
     # Italian flag stripe across the top (thin horizontal stripe)
     stripe_height = 15
@@ -48,59 +49,70 @@ def create_ferrari_f1_classic(output_name='Ferrari_F1_Classic'):
     draw.rectangle([0, stripe_y + stripe_height * 3, width, stripe_y + stripe_height * 3 + 3], fill=FERRARI_YELLOW)
     
     # Mask with template
-    final = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    final.paste(result, mask=template.convert('L'))
-    
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    final.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    return render.save_skin(result, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
 
-def create_ferrari_f1_modern(output_name='Ferrari_F1_Modern'):
-    """Modern Ferrari F1 - red with black side pods and dynamic angles."""
-    template = load_template()
-    width, height = template.size
-    
-    result = Image.new('RGBA', (width, height), FERRARI_RED)
-    draw = ImageDraw.Draw(result)
-    
-    # Black angular sections on sides
-    # Left side black accent
-    points_left = [(0, height * 0.3), (width * 0.35, height * 0.4), 
-                   (width * 0.35, height * 0.8), (0, height * 0.9)]
-    draw.polygon(points_left, fill=FERRARI_BLACK)
-    
-    # Right side black accent
-    points_right = [(width, height * 0.3), (width * 0.65, height * 0.4),
-                    (width * 0.65, height * 0.8), (width, height * 0.9)]
-    draw.polygon(points_right, fill=FERRARI_BLACK)
-    
-    # Yellow racing number area (center rectangle)
-    draw.rectangle([width * 0.4, height * 0.35, width * 0.6, height * 0.55], fill=FERRARI_YELLOW)
-    
-    # Red outline inside yellow
-    draw.rectangle([width * 0.42, height * 0.37, width * 0.58, height * 0.53], fill=FERRARI_RED)
-    
-    # Black bottom
-    draw.rectangle([0, height * 0.85, width, height], fill=FERRARI_BLACK)
-    
-    # Mask with template
-    final = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    final.paste(result, mask=template.convert('L'))
-    
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    final.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+def create_ferrari_f1_modern(output_name='Ferrari_F1_Modern', base_color=FERRARI_RED,
+                             trim_color=FERRARI_BLACK, highlight_color=FERRARI_YELLOW,
+                             number=None, name=None):
+    """Modern Ferrari F1 - red with black side pods and dynamic angles.
 
+    Give a race `number` to put it on the hood and front doors, and a driver
+    `name` for the front panel.
+    """
+    def draw_livery(template_path, size):
+        width, height = size
+        result = render.new_canvas(size, base_color)
+        draw = ImageDraw.Draw(result)
+        
+        # Black angular sections on sides
+        # Left side black accent
+        points_left = [(0, height * 0.3), (width * 0.35, height * 0.4), 
+                       (width * 0.35, height * 0.8), (0, height * 0.9)]
+        draw.polygon(points_left, fill=trim_color)
+        
+        # Right side black accent
+        points_right = [(width, height * 0.3), (width * 0.65, height * 0.4),
+                        (width * 0.65, height * 0.8), (width, height * 0.9)]
+        draw.polygon(points_right, fill=trim_color)
+        
+        # Yellow racing number area (center rectangle)
+        draw.rectangle([width * 0.4, height * 0.35, width * 0.6, height * 0.55], fill=highlight_color)
+        
+        # Red outline inside yellow
+        draw.rectangle([width * 0.42, height * 0.37, width * 0.58, height * 0.53], fill=base_color)
+        
+        # Black bottom
+        draw.rectangle([0, height * 0.85, width, height], fill=trim_color)
+        
+        # The center number area is outside the panels, so personalization goes
+        # on the hood, front doors and front panel of the template being rendered
+        if number is not None or name is not None:
+            index = panels.panel_index(template_path)
+            if number is not None:
+                glyphs.draw_text(result, number, index.box(index.panel_near(0.5, 0.2), size, 0.15),
+                                 highlight_color, outline=trim_color)
+                for x in (0.15, 0.85):
+                    glyphs.draw_text(result, number, index.box(index.panel_near(x, 0.45), size, 0.2),
+                                     highlight_color, outline=base_color)
+            if name is not None:
+                glyphs.draw_text(result, name, index.box(index.panel_near(0.5, 0.05), size, 0.25),
+                                 FERRARI_WHITE, outline=trim_color)
+        return result
+    
+    # Mask with template; text sits on panels, which differ between trims
+    if number is not None or name is not None:
+        return render.save_skin_per_template(draw_livery, output_name, OUTPUT_DIR, TEMPLATE_PATH)
+    result = draw_livery(TEMPLATE_PATH, render.canvas_size(TEMPLATE_PATH))
+    return render.save_skin(result, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
-def create_ferrari_f1_racing(output_name='Ferrari_F1_Racing'):
+
+def create_ferrari_f1_racing(output_name='Ferrari_F1_Racing', base_color=FERRARI_RED,
+                             outer_stripe_color=FERRARI_YELLOW, inner_stripe_color=FERRARI_BLACK):
     """Racing Ferrari - aggressive red with yellow stripes."""
-    template = load_template()
-    width, height = template.size
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
-    result = Image.new('RGBA', (width, height), FERRARI_RED)
+    result = render.new_canvas((width, height), base_color)
     draw = ImageDraw.Draw(result)
     
     # Center yellow racing stripes
@@ -110,64 +122,45 @@ def create_ferrari_f1_racing(output_name='Ferrari_F1_Racing'):
     
     # Outer yellow stripes
     draw.rectangle([center - stripe_width * 2 - gap * 1.5, 0, 
-                    center - stripe_width - gap * 1.5, height], fill=FERRARI_YELLOW)
+                    center - stripe_width - gap * 1.5, height], fill=outer_stripe_color)
     draw.rectangle([center + stripe_width + gap * 1.5, 0,
-                    center + stripe_width * 2 + gap * 1.5, height], fill=FERRARI_YELLOW)
+                    center + stripe_width * 2 + gap * 1.5, height], fill=outer_stripe_color)
     
     # Inner black stripes
     draw.rectangle([center - stripe_width - gap * 0.5, 0,
-                    center - gap * 0.5, height], fill=FERRARI_BLACK)
+                    center - gap * 0.5, height], fill=inner_stripe_color)
     draw.rectangle([center + gap * 0.5, 0,
-                    center + stripe_width + gap * 0.5, height], fill=FERRARI_BLACK)
+                    center + stripe_width + gap * 0.5, height], fill=inner_stripe_color)
     
     # Mask with template
-    final = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    final.paste(result, mask=template.convert('L'))
-    
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    final.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    return render.save_skin(result, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
 
 def create_ferrari_f1_gradient(output_name='Ferrari_F1_Gradient'):
     """Ferrari with dramatic dark-to-red gradient."""
-    template = load_template()
-    width, height = template.size
-    
-    gradient = Image.new('RGBA', (width, height))
-    draw = ImageDraw.Draw(gradient)
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
     # Dark (almost black) at bottom, Ferrari red at top
-    r1, g1, b1 = 239, 26, 45   # Ferrari red
-    r2, g2, b2 = 30, 5, 8      # Very dark red/black
-    
-    for y in range(height):
-        ratio = y / height
-        r = int(r1 + (r2 - r1) * ratio)
-        g = int(g1 + (g2 - g1) * ratio)
-        b = int(b1 + (b2 - b1) * ratio)
-        draw.line([(0, y), (width, y)], fill=(r, g, b, 255))
+    gradient = gradients.linear_gradient((width, height), [(239, 26, 45), (30, 5, 8)], angle=90,
+                                         out=render.new_canvas((width, height)))
+    draw = ImageDraw.Draw(gradient)
     
     # Add yellow accent stripe
     draw.rectangle([0, int(height * 0.45), width, int(height * 0.47)], fill=FERRARI_YELLOW)
     
     # Mask with template
-    result = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    result.paste(gradient, mask=template.convert('L'))
-    
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    result.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    return render.save_skin(gradient, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
 
 if __name__ == '__main__':
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
     print("Generating Ferrari F1 skins...")
-    create_ferrari_f1_classic()
-    create_ferrari_f1_modern()
-    create_ferrari_f1_racing()
-    create_ferrari_f1_gradient()
+    # Only skins whose inputs changed are rebuilt; --force rebuilds everything
+    build_manifest.build([
+        build_manifest.job(create_ferrari_f1_classic),
+        build_manifest.job(create_ferrari_f1_modern),
+        build_manifest.job(create_ferrari_f1_racing),
+        build_manifest.job(create_ferrari_f1_gradient),
+    ], dry_run='--dry-run' in sys.argv, force='--force' in sys.argv)
     print("\nDone! Ferrari F1 skins ready in skins/")
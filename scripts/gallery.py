@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Skin Gallery
+
+Builds thumbnails, a contact sheet and a static HTML index for every skin
+in skins/ and examples/ plus the templates' vehicle images, so the library
+can be reviewed at a glance. Images are decoded at reduced size where the
+format allows it, misses are processed in parallel, and thumbnails are
+cached on disk by file hash so a rebuild only touches new or changed files.
+
+Usage: python gallery.py [--output-dir DIR] [--size 256] [--workers N] [PATH ...]
+
+PATHs are images or directories (default: skins/, examples/ and the
+templates' vehicle_image.png files). Open <output-dir>/index.html.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
+import argparse
+import glob
+import html
+import math
+import os
+import shutil
+
+import asset_cache
+
+REPO_DIR = os.path.join(os.path.dirname(__file__), '..')
+OUTPUT_DIR = os.path.join(REPO_DIR, 'gallery')
+THUMB_CACHE_DIR = os.path.join(REPO_DIR, '.cache', 'thumbs')
+
+THUMB_SIZE = 256
+SHEET_COLUMNS = 8
+SHEET_BACKGROUND = (40, 40, 40, 255)
+LABEL_COLOR = (220, 220, 220, 255)
+LABEL_HEIGHT = 16
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def default_sources():
+    """Sections of the default gallery as (title, paths)."""
+    return [
+        ('Skins', [os.path.join(REPO_DIR, 'skins')]),
+        ('Examples', [os.path.join(REPO_DIR, 'examples')]),
+        ('Vehicle images', sorted(glob.glob(os.path.join(REPO_DIR, 'templates', '*', 'vehicle_image.png')))),
+    ]
+
+
+def find_images(paths):
+    """Expand directories into the images they contain, sorted by name."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            images.append(path)
+    return images
+
+
+def _thumb_path(digest, size):
+    return os.path.join(THUMB_CACHE_DIR, f'{digest}-{size}.png')
+
+
+def make_thumbnail(source, destination, size=THUMB_SIZE):
+    """Write a thumbnail of `source` that fits in size x size; returns the original size.
+
+    Image.thumbnail uses JPEG draft mode and reduce() before resampling, so
+    large images are never resampled at full resolution.
+    """
+    with Image.open(source) as img:
+        original_size = img.size
+        img.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        img = img.convert('RGBA')
+    tmp_path = f'{destination}.{os.getpid()}.tmp'
+    img.save(tmp_path, 'PNG')
+    os.replace(tmp_path, destination)
+    return original_size
+
+
+def build_thumbnails(paths, size=THUMB_SIZE, workers=None):
+    """Return {path: entry} for `paths`, making only the thumbnails not cached yet.
+
+    Each entry has the cached thumbnail path, the file digest and byte size,
+    and the original dimensions.
+    """
+    os.makedirs(THUMB_CACHE_DIR, exist_ok=True)
+    entries = {}
+    missing = []
+    for path in paths:
+        digest = asset_cache.file_digest(path)
+        entry = {'digest': digest, 'thumb': _thumb_path(digest, size), 'bytes': os.path.getsize(path)}
+        entries[path] = entry
+        if os.path.exists(entry['thumb']):
+            # Reads only the header
+            with Image.open(path) as img:
+                entry['size'] = img.size
+        else:
+            missing.append(path)
+
+    if missing:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(make_thumbnail, missing, [entries[path]['thumb'] for path in missing],
+                               [size] * len(missing))
+            for path, original_size in zip(missing, results):
+                entries[path]['size'] = original_size
+    print(f'Thumbnails: {len(paths) - len(missing)} cached, {len(missing)} new')
+    return entries
+
+
+def _labels(paths):
+    """File stems, qualified with the folder name where two files share a stem."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    return [f'{os.path.basename(os.path.dirname(path))}/{stem}' if stems.count(stem) > 1 else stem
+            for path, stem in zip(paths, stems)]
+
+
+def contact_sheet(paths, entries, size=THUMB_SIZE, columns=SHEET_COLUMNS):
+    """Lay out every thumbnail in a labelled grid."""
+    columns = max(1, min(columns, len(paths)))
+    rows = math.ceil(len(paths) / columns)
+    cell_h = size + LABEL_HEIGHT
+    sheet = Image.new('RGBA', (columns * size, rows * cell_h), SHEET_BACKGROUND)
+    draw = ImageDraw.Draw(sheet)
+    for index, (path, label) in enumerate(zip(paths, _labels(paths))):
+        x = (index % columns) * size
+        y = (index // columns) * cell_h
+        with Image.open(entries[path]['thumb']) as thumb:
+            thumb.load()
+            offset = (x + (size - thumb.width) // 2, y + (size - thumb.height) // 2)
+            sheet.paste(thumb, offset, thumb)
+        draw.text((x + 4, y + size + 2), label[-(size // 6):], fill=LABEL_COLOR)
+    return sheet
+
+
+def _html_index(sections, entries, output_dir, size):
+    parts = [
+        '<!DOCTYPE html>',
+        '<html><head><meta charset="utf-8"><title>Skin gallery</title>',
+        '<style>',
+        'body { background: #222; color: #ddd; font-family: sans-serif; }',
+        '.grid { display: flex; flex-wrap: wrap; gap: 12px; }',
+        f'figure {{ margin: 0; width: {size}px; text-align: center; }}',
+        'figure img { max-width: 100%; background: #333; }',
+        'figcaption { font-size: 12px; }',
+        'a { color: inherit; }',
+        '</style></head><body>',
+        '<h1>Skin gallery</h1>',
+        '<p><a href="contact_sheet.jpg">Contact sheet</a></p>',
+    ]
+    for title, paths in sections:
+        if not paths:
+            continue
+        parts.append(f'<h2>{html.escape(title)} ({len(paths)})</h2>')
+        parts.append('<div class="grid">')
+        for path in paths:
+            entry = entries[path]
+            source = html.escape(os.path.relpath(path, output_dir).replace(os.sep, '/'))
+            thumb = html.escape(f'thumbs/{os.path.basename(entry["thumb"])}')
+            name = html.escape(os.path.basename(path))
+            width, height = entry['size']
+            parts.append(
+                f'<figure><a href="{source}"><img src="{thumb}" alt="{name}" loading="lazy"></a>'
+                f'<figcaption>{name}<br>{width}x{height}, {entry["bytes"] / 1024:.0f} KB</figcaption></figure>')
+        parts.append('</div>')
+    parts.append('</body></html>')
+    return '\n'.join(parts) + '\n'
+
+
+def build_gallery(sections=None, output_dir=None, size=THUMB_SIZE, workers=None):
+    """Build thumbnails, contact_sheet.jpg and index.html; returns the index path.
+
+    `sections` is a list of (title, paths) where paths are images or folders.
+    """
+    sections = default_sources() if sections is None else sections
+    output_dir = output_dir if output_dir is not None else OUTPUT_DIR
+    sections = [(title, find_images(paths)) for title, paths in sections]
+    all_paths = [path for _, paths in sections for path in paths]
+    if not all_paths:
+        raise ValueError('No images found for the gallery')
+
+    entries = build_thumbnails(all_paths, size, workers)
+
+    thumbs_dir = os.path.join(output_dir, 'thumbs')
+    os.makedirs(thumbs_dir, exist_ok=True)
+    for entry in entries.values():
+        published = os.path.join(thumbs_dir, os.path.basename(entry['thumb']))
+        if not os.path.exists(published):
+            shutil.copyfile(entry['thumb'], published)
+
+    sheet_path = os.path.join(output_dir, 'contact_sheet.jpg')
+    # JPEG: the sheet is only for viewing, and encoding a big PNG dominated rebuilds
+    contact_sheet(all_paths, entries, size).convert('RGB').save(sheet_path, 'JPEG', quality=90)
+    print(f'Created: {sheet_path}')
+
+    index_path = os.path.join(output_dir, 'index.html')
+    with open(index_path, 'w') as f:
+        f.write(_html_index(sections, entries, output_dir, size))
+    print(f'Created: {index_path}')
+    return index_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build thumbnails, a contact sheet and an HTML index of skins.')
+    parser.add_argument('paths', nargs='*', help='images or folders (default: skins, examples, vehicle images)')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='where to write the gallery')
+    parser.add_argument('--size', type=int, default=THUMB_SIZE, help='thumbnail size in px')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    sections = [('Images', args.paths)] if args.paths else None
+    build_gallery(sections, args.output_dir, args.size, args.workers)
+
+
+if __name__ == '__main__':
+    main()
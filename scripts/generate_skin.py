@@ -5,83 +5,50 @@ Tesla Model Y Wrap Skin Generator
 Generates custom wrap skins by filling the template with colors, gradients, or patterns.
 """
 
-from PIL import Image, ImageDraw
+from PIL import ImageDraw
 import os
 import sys
-import math
-import random
+
+import build_manifest
+import gradients
+import panels
+import patterns
+import render
+import textures
 
 TEMPLATE_PATH = os.path.join(os.path.dirname(__file__), '..', 'templates', 'modely-2025-premium', 'template.png')
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'skins')
 
 
-def load_template():
-    """Load the template and create a mask from it."""
-    template = Image.open(TEMPLATE_PATH).convert('RGBA')
-    # The template has black lines on white - we want to fill the white areas
-    return template
-
-
 def create_solid_color(color, output_name):
     """Create a solid color wrap."""
-    template = load_template()
-    width, height = template.size
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
     # Create a new image with the solid color
-    result = Image.new('RGBA', (width, height), color)
+    result = render.new_canvas((width, height), color)
     
     # Composite with template to preserve the panel outlines
     # The template white areas become our color, black lines stay
-    result = Image.composite(result, template, template.split()[0])
-    
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    result.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    return render.save_skin(result, output_name, OUTPUT_DIR, TEMPLATE_PATH, keep_outlines=True)
 
 
 def create_gradient(color1, color2, direction='vertical', output_name='gradient'):
     """Create a gradient wrap (vertical or horizontal)."""
-    template = load_template()
-    width, height = template.size
-    
-    gradient = Image.new('RGBA', (width, height))
-    draw = ImageDraw.Draw(gradient)
-    
-    r1, g1, b1 = color1
-    r2, g2, b2 = color2
-    
-    if direction == 'vertical':
-        for y in range(height):
-            ratio = y / height
-            r = int(r1 + (r2 - r1) * ratio)
-            g = int(g1 + (g2 - g1) * ratio)
-            b = int(b1 + (b2 - b1) * ratio)
-            draw.line([(0, y), (width, y)], fill=(r, g, b, 255))
-    else:  # horizontal
-        for x in range(width):
-            ratio = x / width
-            r = int(r1 + (r2 - r1) * ratio)
-            g = int(g1 + (g2 - g1) * ratio)
-            b = int(b1 + (b2 - b1) * ratio)
-            draw.line([(x, 0), (x, height)], fill=(r, g, b, 255))
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
-    # Mask with template
-    result = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    result.paste(gradient, mask=template.convert('L'))
+    angle = 90 if direction == 'vertical' else 0
+    gradient = gradients.linear_gradient((width, height), [color1, color2], angle,
+                                         out=render.new_canvas((width, height)))
     
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    result.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    # Mask with template
+    return render.save_skin(gradient, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
 
 def create_stripes(colors, stripe_width=50, direction='horizontal', output_name='stripes'):
     """Create a striped wrap."""
-    template = load_template()
-    width, height = template.size
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
-    stripes = Image.new('RGBA', (width, height))
+    stripes = render.new_canvas((width, height))
     draw = ImageDraw.Draw(stripes)
     
     if direction == 'horizontal':
@@ -94,39 +61,51 @@ def create_stripes(colors, stripe_width=50, direction='horizontal', output_name=
             draw.rectangle([(x, 0), (x + stripe_width, height)], fill=colors[color_idx])
     
     # Mask with template
-    result = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    result.paste(stripes, mask=template.convert('L'))
-    
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    result.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    return render.save_skin(stripes, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
 
 def create_carbon_fiber(output_name='carbon_fiber'):
     """Create a carbon fiber pattern wrap."""
-    template = load_template()
-    width, height = template.size
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
-    pattern = Image.new('RGBA', (width, height), (30, 30, 30, 255))
-    draw = ImageDraw.Draw(pattern)
+    # Diagonal weave, tiled from a cached 8px tile
+    pattern = patterns.fill((width, height), 'carbon', out=render.new_canvas((width, height)))
     
-    # Create diagonal weave pattern
-    for i in range(-height, width + height, 8):
-        draw.line([(i, 0), (i + height, height)], fill=(50, 50, 50, 255), width=2)
-        draw.line([(i + 4, 0), (i + 4 + height, height)], fill=(20, 20, 20, 255), width=2)
+    # Mask with template
+    return render.save_skin(pattern, output_name, OUTPUT_DIR, TEMPLATE_PATH)
+
+
+def create_pattern(name, scale=1, rotation=0, colors=None, output_name='pattern'):
+    """Create a wrap from a tiled pattern (carbon, checker, hex, houndstooth, dots)."""
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
-    for i in range(-height, width + height, 8):
-        draw.line([(i + height, 0), (i, height)], fill=(40, 40, 40, 255), width=2)
+    pattern = patterns.fill((width, height), name, scale, rotation, colors,
+                            out=render.new_canvas((width, height)))
     
     # Mask with template
-    result = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    result.paste(pattern, mask=template.convert('L'))
+    return render.save_skin(pattern, output_name, OUTPUT_DIR, TEMPLATE_PATH)
+
+
+def create_texture(name, seed=0, scale=1, colors=None, output_name='texture'):
+    """Create a wrap from a seeded procedural texture (camo, marble, cells, noise)."""
+    width, height = render.canvas_size(TEMPLATE_PATH)
+    
+    texture = textures.texture((width, height), name, seed, scale, colors)
     
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    result.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    # Mask with template
+    return render.save_skin(texture, output_name, OUTPUT_DIR, TEMPLATE_PATH)
+
+
+def create_two_tone(base_color, accent_color, accent_box=(0, 0.33, 1, 0.8), output_name='two_tone'):
+    """Create a two-tone wrap: panels centred inside `accent_box` (fractions) get the accent color."""
+    def draw(template_path, size):
+        # Panels differ between trims, so look them up in the template being rendered
+        index = panels.panel_index(template_path)
+        result = render.new_canvas(size, base_color)
+        return index.fill(result, index.panels_in(accent_box), accent_color)
+    
+    # Mask with template
+    return render.save_skin_per_template(draw, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
 
 def create_matte_black(output_name='matte_black'):
@@ -136,10 +115,9 @@ def create_matte_black(output_name='matte_black'):
 
 def create_racing_stripes(base_color, stripe_color, output_name='racing_stripes'):
     """Create a wrap with racing stripes down the center."""
-    template = load_template()
-    width, height = template.size
+    width, height = render.canvas_size(TEMPLATE_PATH)
     
-    result = Image.new('RGBA', (width, height), base_color)
+    result = render.new_canvas((width, height), base_color)
     draw = ImageDraw.Draw(result)
     
     # Draw center racing stripes
@@ -151,13 +129,7 @@ def create_racing_stripes(base_color, stripe_color, output_name='racing_stripes'
     draw.rectangle([center + gap//2, 0, center + stripe_width + gap//2, height], fill=stripe_color)
     
     # Mask with template
-    final = Image.new('RGBA', (width, height), (255, 255, 255, 255))
-    final.paste(result, mask=template.convert('L'))
-    
-    output_path = os.path.join(OUTPUT_DIR, f'{output_name}.png')
-    final.save(output_path, 'PNG')
-    print(f'Created: {output_path}')
-    return output_path
+    return render.save_skin(result, output_name, OUTPUT_DIR, TEMPLATE_PATH)
 
 
 if __name__ == '__main__':
@@ -166,12 +138,15 @@ if __name__ == '__main__':
     # Generate some sample skins
     print("Generating sample skins...")
     
-    create_matte_black()
-    create_carbon_fiber()
-    create_gradient((0, 100, 200), (100, 0, 150), 'vertical', 'blue_purple_gradient')
-    create_gradient((200, 50, 50), (50, 50, 50), 'vertical', 'red_fade')
-    create_stripes([(255, 0, 0, 255), (255, 255, 255, 255), (0, 0, 255, 255)], 60, 'horizontal', 'usa_stripes')
-    create_racing_stripes((30, 30, 30, 255), (255, 255, 255, 255), 'racing_stripes_white')
-    create_racing_stripes((255, 255, 255, 255), (255, 0, 0, 255), 'racing_stripes_red')
+    # Only skins whose inputs changed are rebuilt; --force rebuilds everything
+    build_manifest.build([
+        build_manifest.job(create_matte_black),
+        build_manifest.job(create_carbon_fiber),
+        build_manifest.job(create_gradient, (0, 100, 200), (100, 0, 150), 'vertical', 'blue_purple_gradient'),
+        build_manifest.job(create_gradient, (200, 50, 50), (50, 50, 50), 'vertical', 'red_fade'),
+        build_manifest.job(create_stripes, [(255, 0, 0, 255), (255, 255, 255, 255), (0, 0, 255, 255)], 60, 'horizontal', 'usa_stripes'),
+        build_manifest.job(create_racing_stripes, (30, 30, 30, 255), (255, 255, 255, 255), 'racing_stripes_white'),
+        build_manifest.job(create_racing_stripes, (255, 255, 255, 255), (255, 0, 0, 255), 'racing_stripes_red'),
+    ], dry_run='--dry-run' in sys.argv, force='--force' in sys.argv)
     
     print("\nDone! Skins saved to skins/ folder")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Glyph Atlas Text
+
+Race numbers and names for personalized liveries. Each glyph is rasterized
+once per font, size and outline width and kept in an atlas as coverage
+masks; colors and shadows are applied when blitting, so drawing text onto a
+skin is only mask blits. Sizes are rounded to SIZE_STEP so names of similar
+length share an atlas.
+
+    glyphs.draw_text(layer, '16', (400, 150, 620, 330), (255, 242, 0, 255),
+                     outline=(0, 0, 0, 255), shadow=(0, 0, 0, 120))
+
+Blits go in passes - every shadow, then every outline, then every fill -
+so a glyph's outline never covers its neighbour's fill. Kerning is not
+applied.
+"""
+
+from PIL import Image, ImageDraw, ImageFont
+import functools
+import threading
+
+# Tried in order when no font is given; Pillow's built-in font is the fallback
+DEFAULT_FONTS = ('DejaVuSans-Bold.ttf', 'Arial Bold.ttf', 'arialbd.ttf')
+SIZE_STEP = 4
+MIN_SIZE = 8
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(font, size):
+    """A FreeType font by path or file name; None picks the first available default."""
+    if font is not None:
+        return ImageFont.truetype(font, size)
+    for name in DEFAULT_FONTS:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+class Glyph:
+    """One rasterized character: coverage masks plus where they sit relative to the pen."""
+
+    def __init__(self, fill, outline, offset, advance):
+        self.fill = fill
+        self.outline = outline
+        self.offset = offset
+        self.advance = advance
+
+
+def _blit(layer, color, position, mask):
+    """Paste `color` through `mask`; translucent colors scale the mask instead
+    of making the layer itself translucent."""
+    color = tuple(color) + (255,) * (4 - len(color))
+    if color[3] < 255:
+        alpha = color[3]
+        mask = mask.point(lambda v: v * alpha // 255)
+        color = color[:3] + (255,)
+    layer.paste(color, position, mask)
+
+
+class GlyphAtlas:
+    """Glyphs of one font, size and style, rasterized on first use."""
+
+    def __init__(self, font, size, outline_width=0):
+        self.font = load_font(font, size)
+        self.size = size
+        self.outline_width = outline_width
+        self._glyphs = {}
+        self._lock = threading.Lock()
+
+    def glyph(self, char):
+        with self._lock:
+            glyph = self._glyphs.get(char)
+            if glyph is None:
+                glyph = self._glyphs[char] = self._rasterize(char)
+            return glyph
+
+    def _rasterize(self, char):
+        stroke = self.outline_width
+        left, top, right, bottom = self.font.getbbox(char, stroke_width=stroke)
+        advance = self.font.getlength(char)
+        if right <= left or bottom <= top:
+            return Glyph(None, None, (0, 0), advance)
+
+        size = (right - left, bottom - top)
+        origin = (-left, -top)
+        fill = Image.new('L', size)
+        ImageDraw.Draw(fill).text(origin, char, font=self.font, fill=255)
+        outline = None
+        if stroke:
+            outline = Image.new('L', size)
+            ImageDraw.Draw(outline).text(origin, char, font=self.font, fill=255,
+                                         stroke_width=stroke, stroke_fill=255)
+        return Glyph(fill, outline, (left, top), advance)
+
+    def _layout(self, text, position):
+        """(glyph, x, y) for every visible glyph, with the pen starting at `position`."""
+        x, y = position
+        placed = []
+        for char in text:
+            glyph = self.glyph(char)
+            if glyph.fill is not None:
+                placed.append((glyph, int(round(x)) + glyph.offset[0], y + glyph.offset[1]))
+            x += glyph.advance
+        return placed
+
+    def bounds(self, text):
+        """Ink bounding box (x0, y0, x1, y1) of a line of text, outline included, relative to the pen."""
+        placed = self._layout(text, (0, 0))
+        if not placed:
+            return (0, 0, 0, 0)
+        return (min(x for _, x, _ in placed), min(y for _, _, y in placed),
+                max(x + glyph.fill.width for glyph, x, _ in placed),
+                max(y + glyph.fill.height for glyph, _, y in placed))
+
+    def draw(self, layer, text, position, fill, outline=None, shadow=None, shadow_offset=(4, 4)):
+        """Blit `text` onto `layer` with the pen (left end of the ascender line) at `position`."""
+        placed = self._layout(text, position)
+
+        cover = 'outline' if self.outline_width else 'fill'
+        if shadow is not None:
+            dx, dy = shadow_offset
+            for glyph, gx, gy in placed:
+                _blit(layer, shadow, (gx + dx, gy + dy), getattr(glyph, cover))
+        if outline is not None and self.outline_width:
+            for glyph, gx, gy in placed:
+                _blit(layer, outline, (gx, gy), glyph.outline)
+        for glyph, gx, gy in placed:
+            _blit(layer, fill, (gx, gy), glyph.fill)
+        return layer
+
+
+@functools.lru_cache(maxsize=64)
+def atlas(font, size, outline_width=0):
+    """The shared GlyphAtlas for a font, size and outline width."""
+    return GlyphAtlas(font, size, outline_width)
+
+
+def fit_size(text, box_size, font=None, outline_ratio=0.0, max_size=None):
+    """Largest SIZE_STEP multiple at which `text` fits in a box of `box_size` px.
+
+    Measured with the font's own metrics at a reference size, so nothing is
+    rasterized.
+    """
+    reference = 100
+    left, top, right, bottom = load_font(font, reference).getbbox(text)
+    width = right - left + 2 * outline_ratio * reference
+    height = bottom - top + 2 * outline_ratio * reference
+    scale = min(box_size[0] / max(width, 1), box_size[1] / max(height, 1))
+    size = int(reference * scale) // SIZE_STEP * SIZE_STEP
+    if max_size is not None:
+        size = min(size, max_size)
+    return max(size, MIN_SIZE)
+
+
+def draw_text(layer, text, box, fill, font=None, outline=None, outline_ratio=0.06,
+              shadow=None, shadow_ratio=0.04, max_size=None):
+    """Draw `text` as large as fits, centred in `box` (x0, y0, x1, y1 in px).
+
+    Outline width and shadow offset scale with the font size, as fractions
+    of it. Returns the layer.
+    """
+    text = str(text)
+    if not text:
+        return layer
+    x0, y0, x1, y1 = [int(value) for value in box]
+    ratio = outline_ratio if outline is not None else 0.0
+    size = fit_size(text, (x1 - x0, y1 - y0), font, ratio, max_size)
+    outline_width = int(round(size * ratio))
+    glyph_atlas = atlas(font, size, outline_width)
+
+    # Centre the ink, not the line box, so digits sit in the middle
+    left, top, right, bottom = glyph_atlas.bounds(text)
+    position = ((x0 + x1 - left - right) // 2, (y0 + y1 - top - bottom) // 2)
+    offset = max(1, int(round(size * shadow_ratio)))
+    return glyph_atlas.draw(layer, text, position, fill, outline, shadow, (offset, offset))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Gradient Engine
+
+Builds whole gradient images as arrays instead of drawing them line by line.
+
+Stops are either a list of colors, spread evenly from 0 to 1, or a list of
+``(position, color)`` pairs. Colors may be RGB or RGBA; give the stops
+different alpha values to get an alpha ramp.
+
+Colors are computed a band of rows at a time. Pass `out` (an RGBA image of
+the same size, e.g. render.new_canvas) to draw into an existing image
+instead of allocating one; the gradient then never exists at full size as
+an array.
+"""
+
+from PIL import Image
+import numpy as np
+import math
+
+# Rows colorized at a time
+BAND_ROWS = 64
+
+
+def _parse_stops(stops):
+    """Return sorted stop positions and an (N, 4) float array of RGBA colors."""
+    if len(stops) < 2:
+        raise ValueError('A gradient needs at least two color stops')
+
+    if all(isinstance(stop[1], (tuple, list)) for stop in stops):
+        stops = sorted(stops, key=lambda stop: stop[0])
+        positions = [float(position) for position, _ in stops]
+        colors = [color for _, color in stops]
+    else:
+        positions = [i / (len(stops) - 1) for i in range(len(stops))]
+        colors = list(stops)
+
+    colors = [tuple(color) + (255,) * (4 - len(color)) for color in colors]
+    return np.asarray(positions, dtype=np.float64), np.asarray(colors, dtype=np.float64)
+
+
+def _colorize_band(t, positions, colors):
+    """uint8 RGBA pixels for a block of ratios."""
+    t = np.clip(np.asarray(t, dtype=np.float64), positions[0], positions[-1])
+
+    # Segment each ratio falls in, and how far along that segment it is
+    index = np.clip(np.searchsorted(positions, t, side='right') - 1, 0, len(positions) - 2)
+    span = positions[index + 1] - positions[index]
+    ratio = np.divide(t - positions[index], span, out=np.zeros_like(t), where=span > 0)
+
+    start = colors[index]
+    end = colors[index + 1]
+    return (start + (end - start) * ratio[..., np.newaxis]).astype(np.uint8)
+
+
+def _colorize(t, size, stops, out=None):
+    """Map a ratio array `t` (broadcastable to the image) through the stops.
+
+    Works a band of rows at a time, so the float temporaries stay band-sized
+    however large the image is.
+    """
+    positions, colors = _parse_stops(stops)
+    width, height = size
+    t = np.asarray(t)
+    # A single row of ratios is the same for every band; map it once
+    row = _colorize_band(t, positions, colors) if t.ndim < 2 or t.shape[0] == 1 else None
+
+    pixels = np.empty((height, width, 4), dtype=np.uint8) if out is None else None
+    for top in range(0, height, BAND_ROWS):
+        rows = min(BAND_ROWS, height - top)
+        band = row if row is not None else _colorize_band(t[top:top + rows], positions, colors)
+        band = np.broadcast_to(band, (rows, width, 4))
+        if out is None:
+            pixels[top:top + rows] = band
+        else:
+            out.paste(Image.fromarray(np.ascontiguousarray(band)), (0, top))
+    return out if out is not None else Image.fromarray(pixels)
+
+
+def _grid(size):
+    width, height = size
+    xs = np.arange(width, dtype=np.float64)[np.newaxis, :]
+    ys = np.arange(height, dtype=np.float64)[:, np.newaxis]
+    return xs, ys
+
+
+def linear_gradient(size, stops, angle=90, out=None):
+    """Linear gradient across the whole image.
+
+    `angle` is in degrees: 0 runs left to right, 90 runs top to bottom.
+    """
+    width, height = size
+    xs, ys = _grid(size)
+    dx = round(math.cos(math.radians(angle)), 12)
+    dy = round(math.sin(math.radians(angle)), 12)
+
+    # Project onto the gradient direction; only keep the axes that matter so
+    # horizontal and vertical gradients stay one-dimensional until the end
+    t = 0.0
+    if dx:
+        t = t + xs * dx
+    if dy:
+        t = t + ys * dy
+
+    corners = [0.0, width * dx, height * dy, width * dx + height * dy]
+    low, high = min(corners), max(corners)
+    t = (t - low) / (high - low)
+    return _colorize(t, size, stops, out)
+
+
+def radial_gradient(size, stops, center=None, radius=None):
+    """Radial gradient from `center` (default: image center) out to `radius`.
+
+    The default radius reaches the farthest corner.
+    """
+    width, height = size
+    cx, cy = center if center is not None else (width / 2, height / 2)
+    if radius is None:
+        radius = max(math.hypot(x - cx, y - cy) for x in (0, width) for y in (0, height))
+
+    xs, ys = _grid(size)
+    t = np.hypot(xs - cx, ys - cy) / radius
+    return _colorize(t, size, stops)
+
+
+def conic_gradient(size, stops, center=None, start_angle=0):
+    """Conic (angular) gradient sweeping clockwise around `center`."""
+    width, height = size
+    cx, cy = center if center is not None else (width / 2, height / 2)
+
+    xs, ys = _grid(size)
+    angles = np.degrees(np.arctan2(ys - cy, xs - cx)) - start_angle
+    t = np.mod(angles, 360.0) / 360.0
+    return _colorize(t, size, stops)
+
+
+def gradient_map(values, stops):
+    """Color a 2-D array of values in [0, 1] through the stops, e.g. a noise field."""
+    height, width = values.shape
+    return _colorize(values, (width, height), stops)
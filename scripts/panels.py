@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Template Panel Index
+
+Splits a template into its separate panels (hood, doors, bumpers, ...) with
+connected-component labelling, so generators can color individual panels by
+array lookup instead of drawing hand-placed polygons. The label map, panel
+bounding boxes and areas are computed once per template and cached on disk,
+keyed by the template's file hash. The key also covers the labelling
+parameters and code (`label`, `_grow_into_edges`, `build_index`), so changing
+either invalidates the disk cache instead of serving stale label maps.
+
+Panels are numbered 1..N from top to bottom; 0 is everything else. Look
+panels up by position rather than hard-coding numbers:
+
+    index = panels.panel_index(TEMPLATE_PATH)
+    hood = index.panel_at(0.5, 0.1)
+    layer = index.fill(layer, [hood], (0, 0, 0, 255))
+"""
+
+from PIL import Image
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+import numpy as np
+
+import asset_cache
+import gradients
+import patterns
+import template_cache
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', '.cache', 'panels')
+
+# Mask level that counts as inside a panel
+PANEL_LEVEL = 128
+# Components smaller than this are specks of anti-aliasing or logo detail
+MIN_PANEL_AREA = 200
+# Passes that grow panels into their anti-aliased edge pixels
+EDGE_GROWTH = 2
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _runs(binary):
+    """Horizontal runs of True pixels as (row, start, end) arrays, end exclusive."""
+    height, width = binary.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = binary
+    edges = np.diff(padded, axis=1)
+    start_rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return start_rows, starts, ends
+
+
+def _find_roots(parent):
+    """Point every entry at its root with repeated pointer jumping."""
+    while True:
+        jumped = parent[parent]
+        if np.array_equal(jumped, parent):
+            return parent
+        parent = jumped
+
+
+def label(binary):
+    """4-connected component labels for a boolean array.
+
+    Works on runs rather than pixels: runs in neighbouring rows that overlap
+    are merged with a vectorized union-find. Returns (labels, count) with
+    components numbered 1..count in order of their first pixel.
+    """
+    rows, starts, ends = _runs(binary)
+    count = len(rows)
+    if count == 0:
+        return np.zeros(binary.shape, dtype=np.int32), 0
+
+    # Runs are sorted by row then start, so each row's runs are a contiguous block
+    row_first = np.searchsorted(rows, np.arange(binary.shape[0] + 1))
+
+    # Runs in the row above that overlap each run, as [lo, hi) slices: their
+    # ends lie past our start and their starts before our end
+    lo = np.empty(count, dtype=np.int64)
+    hi = np.empty(count, dtype=np.int64)
+    for row in np.unique(rows[rows > 0]):
+        mine = slice(row_first[row], row_first[row + 1])
+        above = slice(row_first[row - 1], row_first[row])
+        lo[mine] = above.start + np.searchsorted(ends[above], starts[mine], side='right')
+        hi[mine] = above.start + np.searchsorted(starts[above], ends[mine], side='left')
+    lo[rows == 0] = hi[rows == 0] = 0
+
+    overlaps = np.maximum(hi - lo, 0)
+    run_a = np.repeat(np.arange(count), overlaps)
+    run_b = np.arange(overlaps.sum()) - np.repeat(np.cumsum(overlaps) - overlaps, overlaps) + np.repeat(lo, overlaps)
+
+    # Min-label propagation over the overlap edges until nothing changes
+    parent = np.arange(count)
+    while len(run_a):
+        low = np.minimum(parent[run_a], parent[run_b])
+        before = parent.copy()
+        np.minimum.at(parent, parent[run_a], low)
+        np.minimum.at(parent, parent[run_b], low)
+        parent = _find_roots(parent)
+        if np.array_equal(parent, before):
+            break
+
+    roots, component = np.unique(parent, return_inverse=True)
+    labels = np.zeros(binary.shape, dtype=np.int32)
+    lengths = ends - starts
+    flat = np.repeat(rows * binary.shape[1] + starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    labels.flat[flat] = np.repeat(component + 1, lengths)
+    return labels, len(roots)
+
+
+def _grow_into_edges(labels, mask, passes):
+    """Give unlabelled anti-aliased edge pixels the label of a labelled neighbour."""
+    for _ in range(passes):
+        padded = np.pad(labels, 1)
+        neighbours = np.maximum.reduce([padded[:-2, 1:-1], padded[2:, 1:-1], padded[1:-1, :-2], padded[1:-1, 2:]])
+        grow = (labels == 0) & (mask > 0) & (neighbours > 0)
+        labels = np.where(grow, neighbours, labels)
+    return labels
+
+
+def build_index(template_path):
+    """Segment a template into panels; returns (labels, bboxes, areas).
+
+    bboxes are (x0, y0, x1, y1) with exclusive ends, indexed by panel number
+    (row 0 is unused).
+    """
+    template = template_cache.get_template(template_path)
+    mask = np.asarray(template.mask)
+    # The transparent surround is white too; it is not a panel
+    mask = np.where(np.asarray(template.image)[..., 3] >= PANEL_LEVEL, mask, 0)
+    labels, count = label(mask >= PANEL_LEVEL)
+
+    # Drop specks and renumber the remaining panels 1..N
+    areas = np.bincount(labels.ravel(), minlength=count + 1)
+    keep = areas >= MIN_PANEL_AREA
+    keep[0] = False
+    renumber = np.zeros(count + 1, dtype=np.uint16)
+    renumber[keep] = np.arange(1, keep.sum() + 1)
+    labels = _grow_into_edges(renumber[labels], mask, EDGE_GROWTH)
+
+    count = int(keep.sum())
+    ys, xs = np.nonzero(labels)
+    ids = labels[ys, xs]
+    bboxes = np.zeros((count + 1, 4), dtype=np.int32)
+    bboxes[1:, :2] = np.iinfo(np.int32).max
+    np.minimum.at(bboxes[:, 0], ids, xs)
+    np.minimum.at(bboxes[:, 1], ids, ys)
+    np.maximum.at(bboxes[:, 2], ids, xs + 1)
+    np.maximum.at(bboxes[:, 3], ids, ys + 1)
+    areas = np.bincount(ids, minlength=count + 1)
+    return labels, bboxes, areas
+
+
+class PanelIndex:
+    """Panel label map of one template, with per-panel bounding boxes and areas."""
+
+    def __init__(self, labels, bboxes, areas):
+        self.labels = labels
+        self.bboxes = bboxes
+        self.areas = areas
+        self.count = len(areas) - 1
+        self.size = (labels.shape[1], labels.shape[0])
+        self._resized = {}
+
+    def panel_at(self, x, y):
+        """Panel under a point given as fractions of the width and height (0 if none)."""
+        width, height = self.size
+        return int(self.labels[min(int(y * height), height - 1), min(int(x * width), width - 1)])
+
+    def panel_near(self, x, y):
+        """Panel under a point, or the panel whose bounding-box centre is closest to it.
+
+        Trims move panel edges around, so a point that sits on a door in one
+        template can land on an outline gap in another.
+        """
+        panel = self.panel_at(x, y)
+        if panel or not self.count:
+            return panel
+        width, height = self.size
+        centres = (self.bboxes[1:, :2] + self.bboxes[1:, 2:]) / 2
+        distances = np.hypot(centres[:, 0] - x * width, centres[:, 1] - y * height)
+        return int(np.argmin(distances)) + 1
+
+    def panels_in(self, box):
+        """Panels whose bounding-box centre lies inside `box` (fractions: x0, y0, x1, y1)."""
+        width, height = self.size
+        centres = (self.bboxes[1:, :2] + self.bboxes[1:, 2:]) / 2 / (width, height)
+        x0, y0, x1, y1 = box
+        inside = (centres[:, 0] >= x0) & (centres[:, 0] < x1) & (centres[:, 1] >= y0) & (centres[:, 1] < y1)
+        return [int(i) + 1 for i in np.nonzero(inside)[0]]
+
+    def box(self, panel, size=None, margin=0.0):
+        """Pixel bounding box of a panel at `size`, shrunk by `margin` (a fraction) on each side."""
+        width, height = size or self.size
+        x0, y0, x1, y1 = self.bboxes[panel]
+        inset_x = (x1 - x0) * margin
+        inset_y = (y1 - y0) * margin
+        scale_x = width / self.size[0]
+        scale_y = height / self.size[1]
+        return ((x0 + inset_x) * scale_x, (y0 + inset_y) * scale_y,
+                (x1 - inset_x) * scale_x, (y1 - inset_y) * scale_y)
+
+    def _labels_for(self, size):
+        """The label map at `size` (nearest-neighbour resampled if needed)."""
+        if size == self.size:
+            return self.labels
+        if size not in self._resized:
+            resized = Image.fromarray(self.labels).resize(size, Image.Resampling.NEAREST)
+            self._resized[size] = np.asarray(resized)
+        return self._resized[size]
+
+    def select(self, panels, size=None):
+        """Boolean array that is True on the given panels."""
+        lookup = np.zeros(self.count + 1, dtype=bool)
+        lookup[list(panels)] = True
+        return lookup[self._labels_for(size or self.size)]
+
+    def mask(self, panels, size=None):
+        """L-mode mask of the given panels, e.g. for Image.paste."""
+        return Image.fromarray(self.select(panels, size).astype(np.uint8) * 255)
+
+    def _apply(self, layer, panels, source):
+        pixels = np.array(layer.convert('RGBA'))
+        selected = self.select(panels, layer.size)
+        pixels[selected] = np.asarray(source)[selected]
+        return Image.fromarray(pixels)
+
+    def fill(self, layer, panels, color):
+        """Return `layer` with the given panels filled with `color`."""
+        pixels = np.array(layer.convert('RGBA'))
+        pixels[self.select(panels, layer.size)] = tuple(color) + (255,) * (4 - len(color))
+        return Image.fromarray(pixels)
+
+    def gradient(self, layer, panels, stops, angle=90):
+        """Return `layer` with a linear gradient across each given panel's own bounding box.
+
+        `angle` follows gradients.linear_gradient: 0 runs left to right, 90
+        top to bottom.
+        """
+        width, height = layer.size
+        labels = self._labels_for(layer.size)
+        scale = np.asarray([width, height, width, height], dtype=np.float64) / (self.size * 2)
+        boxes = self.bboxes * scale
+
+        theta = np.radians(angle)
+        dx, dy = np.cos(theta), np.sin(theta)
+        # Project each box's corners on the gradient direction to get its extent
+        corners_x = boxes[:, [0, 2, 0, 2]]
+        corners_y = boxes[:, [1, 1, 3, 3]]
+        projected = corners_x * dx + corners_y * dy
+        low = projected.min(axis=1)
+        extent = np.maximum(projected.max(axis=1) - low, 1e-9)
+
+        xs = np.arange(width, dtype=np.float64)[np.newaxis, :] + 0.5
+        ys = np.arange(height, dtype=np.float64)[:, np.newaxis] + 0.5
+        t = (xs * dx + ys * dy - low[labels]) / extent[labels]
+        return self._apply(layer, panels, gradients.gradient_map(np.clip(t, 0, 1), stops))
+
+    def pattern(self, layer, panels, name, scale=1, rotation=0, colors=None):
+        """Return `layer` with a tiled pattern on the given panels."""
+        return self._apply(layer, panels, patterns.fill(layer.size, name, scale, rotation, colors))
+
+
+@functools.lru_cache(maxsize=None)
+def _build_hash():
+    """Hash of the parameters and code that build a panel index."""
+    h = hashlib.sha256()
+    h.update(json.dumps([PANEL_LEVEL, MIN_PANEL_AREA, EDGE_GROWTH]).encode())
+    for fn in (_runs, _find_roots, label, _grow_into_edges, build_index):
+        h.update(inspect.getsource(fn).encode())
+    return h.hexdigest()
+
+
+def _cache_path(template_path):
+    digest = asset_cache.file_digest(template_path)
+    return os.path.join(CACHE_DIR, f'{digest}-{_build_hash()[:16]}.npz')
+
+
+def panel_index(template_path=template_cache.DEFAULT_TEMPLATE):
+    """Return the PanelIndex for a template, from memory, the disk cache, or by building it."""
+    path = _cache_path(template_path)
+    with _lock:
+        if path in _cache:
+            return _cache[path]
+
+    if os.path.exists(path):
+        with np.load(path) as data:
+            index = PanelIndex(data['labels'], data['bboxes'], data['areas'])
+    else:
+        labels, bboxes, areas = build_index(template_path)
+        index = PanelIndex(labels, bboxes, areas)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write then rename so parallel workers never see a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez_compressed(tmp_path, labels=labels, bboxes=bboxes, areas=areas)
+        os.replace(tmp_path, path)
+
+    with _lock:
+        _cache[path] = index
+    return index
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Pattern Engine
+
+Repeating patterns are built as one seamless tile and then tiled across the
+canvas with array operations, instead of drawing every line or shape over
+the full image. Tiles are cached, so repeat renders only pay for the tiling.
+
+Available tiles: carbon, checker, hex, houndstooth, dots.
+
+`fill(..., out=image)` writes into an existing image instead, pasting one
+band of tile rows down it so the pattern is never built at full size.
+"""
+
+from PIL import Image, ImageDraw
+import functools
+import math
+
+import numpy as np
+
+# Approximate rows per band when filling an existing image
+BAND_ROWS = 64
+
+
+def _carbon(scale, colors):
+    """Diagonal carbon weave - the pattern create_carbon_fiber used to draw line by line."""
+    base, light, dark, cross = colors or ((30, 30, 30, 255), (50, 50, 50, 255),
+                                          (20, 20, 20, 255), (40, 40, 40, 255))
+    period = 8 * scale
+    width = 2 * scale
+    offset = 4 * scale
+
+    # Draw on a 3x3 block of periods and keep the middle one, so lines that
+    # cross the tile edges are complete
+    span = period * 3
+    canvas = Image.new('RGBA', (span, span), base)
+    draw = ImageDraw.Draw(canvas)
+    for i in range(-span, span * 2, period):
+        draw.line([(i, 0), (i + span, span)], fill=light, width=width)
+        draw.line([(i + offset, 0), (i + offset + span, span)], fill=dark, width=width)
+    for i in range(-span, span * 2, period):
+        draw.line([(i + span, 0), (i, span)], fill=cross, width=width)
+    return np.asarray(canvas)[period:period * 2, period:period * 2]
+
+
+def _checker(scale, colors):
+    first, second = colors or ((20, 20, 20, 255), (235, 235, 235, 255))
+    cell = 16 * scale
+    ys, xs = np.indices((cell * 2, cell * 2))
+    pick = ((xs // cell + ys // cell) % 2).astype(bool)
+    return np.where(pick[..., np.newaxis], np.asarray(second, np.uint8), np.asarray(first, np.uint8))
+
+
+def _dots(scale, colors):
+    """Dot matrix: one anti-aliased dot per cell."""
+    background, dot = colors or ((15, 15, 15, 255), (230, 230, 230, 255))
+    cell = 16 * scale
+    radius = cell * 0.3
+    ys, xs = np.indices((cell, cell)) + 0.5
+    distance = np.hypot(xs - cell / 2, ys - cell / 2)
+    coverage = np.clip(radius - distance + 0.5, 0.0, 1.0)[..., np.newaxis]
+    return _blend(background, dot, coverage)
+
+
+def _hex(scale, colors):
+    """Honeycomb of pointy-top hexagons with outlined cells."""
+    fill, line = colors or ((35, 35, 35, 255), (90, 90, 90, 255))
+    radius = 10 * scale
+    tile_w = int(round(math.sqrt(3) * radius))
+    tile_h = 3 * radius
+
+    # Hex cells are the Voronoi cells of this lattice; list every center that
+    # can be nearest to a pixel inside the tile
+    centers = []
+    for gy in range(-1, 3):
+        for gx in range(-1, 3):
+            centers.append((gx * tile_w, gy * tile_h))
+            centers.append((gx * tile_w + tile_w / 2, gy * tile_h + tile_h / 2))
+    centers = np.asarray(centers, dtype=np.float64)
+
+    ys, xs = np.indices((tile_h, tile_w)) + 0.5
+    distance = np.hypot(xs[..., np.newaxis] - centers[:, 0], ys[..., np.newaxis] - centers[:, 1])
+    distance.sort(axis=2)
+    # Pixels about equally close to two centers lie on a cell edge
+    edge = distance[..., 1] - distance[..., 0]
+    coverage = np.clip(1.5 * scale - edge + 0.5, 0.0, 1.0)[..., np.newaxis]
+    return _blend(fill, line, coverage)
+
+
+def _houndstooth(scale, colors):
+    dark, light = colors or ((20, 20, 20, 255), (235, 235, 235, 255))
+    half = 4
+    ys, xs = np.indices((half * 2, half * 2))
+    # Solid dark and light quadrants joined by diagonal "teeth"
+    is_dark = (xs < half) & (ys < half)
+    off_diagonal = (xs < half) != (ys < half)
+    is_dark |= off_diagonal & ((xs + ys) % half < half // 2)
+    unit = np.where(is_dark[..., np.newaxis], np.asarray(dark, np.uint8), np.asarray(light, np.uint8))
+    return unit.repeat(2 * scale, axis=0).repeat(2 * scale, axis=1)
+
+
+def _blend(background, foreground, coverage):
+    background = np.asarray(background, dtype=np.float64)
+    foreground = np.asarray(foreground, dtype=np.float64)
+    return (background + (foreground - background) * coverage + 0.5).astype(np.uint8)
+
+
+TILES = {
+    'carbon': _carbon,
+    'checker': _checker,
+    'dots': _dots,
+    'hex': _hex,
+    'houndstooth': _houndstooth,
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _cached_tile(name, scale, colors):
+    tile = np.ascontiguousarray(TILES[name](scale, colors))
+    tile.flags.writeable = False
+    return tile
+
+
+def tile(name, scale=1, colors=None):
+    """Return the (read-only) RGBA tile array for a pattern.
+
+    `scale` is an integer size multiplier; `colors` overrides the pattern's
+    default colors, in the order its tile function expects.
+    """
+    if name not in TILES:
+        raise ValueError(f'Unknown pattern {name!r}; choose from {", ".join(sorted(TILES))}')
+    if int(scale) < 1:
+        raise ValueError(f'Pattern scale must be at least 1, got {scale!r}')
+    if colors is not None:
+        colors = tuple(tuple(color) + (255,) * (4 - len(color)) for color in colors)
+    return _cached_tile(name, int(scale), colors)
+
+
+def fill(size, name, scale=1, rotation=0, colors=None, out=None):
+    """Fill an image of `size` with a pattern, optionally rotated by `rotation` degrees.
+
+    With `out` (an RGBA image of `size`) the pattern is pasted into it and
+    `out` is returned.
+    """
+    width, height = size
+    pattern = tile(name, scale, colors)
+
+    if rotation % 360:
+        # Tile a square big enough to cover the canvas at any angle, rotate,
+        # and crop the middle
+        side = int(math.ceil(math.hypot(width, height)))
+        big = fill((side, side), name, scale, 0, colors)
+        big = big.rotate(rotation, resample=Image.Resampling.BICUBIC)
+        left = (side - width) // 2
+        top = (side - height) // 2
+        rotated = big.crop((left, top, left + width, top + height))
+        if out is None:
+            return rotated
+        out.paste(rotated)
+        return out
+
+    tile_h, tile_w = pattern.shape[:2]
+    if out is None:
+        repeats = (-(-height // tile_h), -(-width // tile_w), 1)
+        return Image.fromarray(np.ascontiguousarray(np.tile(pattern, repeats)[:height, :width]))
+
+    # Every band of whole tile rows is the same, so build one and paste it down
+    band_h = tile_h * max(1, BAND_ROWS // tile_h)
+    band = np.tile(pattern, (band_h // tile_h, -(-width // tile_w), 1))[:, :width]
+    band = Image.fromarray(np.ascontiguousarray(band))
+    for top in range(0, height, band_h):
+        out.paste(band, (0, top))
+    return out
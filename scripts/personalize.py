@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Batch Personalization
+
+Renders one personalized livery per row of a CSV of race numbers and
+names, using the batch renderer's process pool and incremental manifest.
+Workers keep their glyph atlases between skins, so after the first few
+rows each skin's text is only blits.
+
+CSV columns: `number`, `name`, and optionally `output_name`. Rows without
+an output_name are saved as ``<prefix>_<number>_<name>.png``.
+
+Usage: python personalize.py CSV [--generator create_ferrari_f1_modern] [--prefix Livery]
+                             [--output-dir DIR] [--workers N] [--all-trims] [--dry-run] [--force]
+                             [--low-memory] [--memory-budget MB]
+"""
+
+import argparse
+import csv
+import inspect
+import re
+import sys
+
+import batch_render
+
+DEFAULT_GENERATOR = 'create_ferrari_f1_modern'
+DEFAULT_PREFIX = 'Livery'
+
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '_', text).strip('_')
+
+
+def load_rows(csv_path, generator=DEFAULT_GENERATOR, prefix=DEFAULT_PREFIX):
+    """Read a personalization CSV into batch_render skin entries."""
+    generators = batch_render.available_generators()
+    if generator not in generators:
+        raise ValueError(f'Unknown generator {generator!r}')
+    accepted = inspect.signature(generators[generator]).parameters
+    if 'number' not in accepted or 'name' not in accepted:
+        raise ValueError(f'{generator} does not take a number and name')
+
+    skins = []
+    seen = set()
+    with open(csv_path, newline='', encoding='utf-8-sig') as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            number = (row.get('number') or '').strip() or None
+            name = (row.get('name') or '').strip() or None
+            if number is None and name is None:
+                raise ValueError(f'{csv_path}:{line}: row has neither a number nor a name')
+            output_name = (row.get('output_name') or '').strip()
+            if not output_name:
+                output_name = '_'.join(part for part in (prefix, number, _slug(name or '')) if part)
+            if output_name in seen:
+                raise ValueError(f'{csv_path}:{line}: duplicate output name {output_name!r}')
+            seen.add(output_name)
+            skins.append({'generator': generator,
+                          'params': {'number': number, 'name': name, 'output_name': output_name}})
+    return skins
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render one personalized livery per CSV row.')
+    parser.add_argument('csv', help='CSV with number and name columns')
+    parser.add_argument('--generator', default=DEFAULT_GENERATOR, help='generator taking number and name')
+    parser.add_argument('--prefix', default=DEFAULT_PREFIX, help='file name prefix for rows without output_name')
+    parser.add_argument('--output-dir', default=None, help='output folder (default: the generator\'s)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--all-trims', action='store_true', help='render for every template, one folder per trim')
+    parser.add_argument('--dry-run', action='store_true', help='list the skins that would be rendered')
+    parser.add_argument('--force', action='store_true', help='render every row, even if up to date')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='draw into one reused canvas per worker and mask it in place')
+    parser.add_argument('--memory-budget', type=float, default=None, metavar='MB',
+                        help='cap the workers to fit this much memory')
+    args = parser.parse_args(argv)
+
+    skins = load_rows(args.csv, args.generator, args.prefix)
+    memory_budget = int(args.memory_budget * 2**20) if args.memory_budget is not None else None
+    return batch_render.render_skins(skins, args.output_dir, args.workers, args.all_trims,
+                                     args.dry_run, args.force, low_memory=args.low_memory,
+                                     memory_budget=memory_budget)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Size-Budgeted PNG Encoder
+
+Tesla rejects wrap skins over 1 MB. `save_png` writes a skin under a byte
+budget by trying progressively heavier encodings, cheapest first:
+
+1. Pillow's default settings - almost every skin already fits here.
+2. Lossless tweaks: zlib level 9 with the RLE or default strategy.
+3. Palette quantization, picking the largest palette that fits by binary search.
+
+If the first encode is far over budget the lossless tweaks are skipped,
+since they only shave a few percent.
+"""
+
+from PIL import Image
+import io
+import os
+import threading
+import time
+import zlib
+
+import profiling
+
+MAX_SKIN_BYTES = 1000000
+
+# Lossless tweaks rarely save more than this fraction over the default encode
+LOSSLESS_HEADROOM = 0.15
+
+LOSSLESS_OPTIONS = [
+    {'compress_level': 9, 'compress_type': zlib.Z_RLE},
+    {'compress_level': 9},
+]
+
+PALETTE_SIZES = [256, 192, 128, 96, 64, 48, 32, 16]
+
+_last = threading.local()
+
+
+def _encode(image, options):
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', **options)
+    return buffer.getvalue()
+
+
+def _quantize(image, colors):
+    method = Image.Quantize.FASTOCTREE if image.mode == 'RGBA' else Image.Quantize.MEDIANCUT
+    return image.quantize(colors, method=method)
+
+
+def encode_png(image, max_bytes=MAX_SKIN_BYTES):
+    """Encode `image` as PNG bytes no larger than `max_bytes`.
+
+    Returns (data, stats) where stats records the chosen options, the final
+    size, the number of encodes tried and the total encode time.
+    """
+    start = time.perf_counter()
+    attempts = 0
+
+    def result(data, options):
+        return data, {'bytes': len(data), 'options': options, 'attempts': attempts,
+                      'seconds': time.perf_counter() - start}
+
+    data = _encode(image, {})
+    attempts += 1
+    if len(data) <= max_bytes:
+        return result(data, {})
+
+    if len(data) <= max_bytes * (1 + LOSSLESS_HEADROOM):
+        for options in LOSSLESS_OPTIONS:
+            data = _encode(image, options)
+            attempts += 1
+            if len(data) <= max_bytes:
+                return result(data, options)
+
+    # Binary search for the largest palette that still fits
+    best = None
+    low, high = 0, len(PALETTE_SIZES) - 1
+    while low <= high:
+        middle = (low + high) // 2
+        colors = PALETTE_SIZES[middle]
+        data = _encode(_quantize(image, colors), {'compress_level': 9})
+        attempts += 1
+        if len(data) <= max_bytes:
+            best = (data, {'compress_level': 9, 'palette': colors})
+            high = middle - 1
+        else:
+            low = middle + 1
+
+    if best is None:
+        raise ValueError(f'PNG does not fit in {max_bytes} bytes even with '
+                         f'{PALETTE_SIZES[-1]} colors ({len(data)} bytes)')
+    return result(*best)
+
+
+def _stream(image, output_path, max_bytes):
+    """Encode with the default settings straight into a file next to `output_path`.
+
+    The file only replaces `output_path` if it is within `max_bytes`, so an
+    over-budget encode never leaves a skin Tesla would reject. Returns stats
+    on success, otherwise None (the budgeted path then writes the file).
+    """
+    start = time.perf_counter()
+    tmp_path = f'{output_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        with profiling.stage('encode'):
+            with open(tmp_path, 'wb') as f:
+                image.save(f, 'PNG')
+                size = f.tell()
+        if size > max_bytes:
+            return None
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {'bytes': size, 'options': {}, 'attempts': 1, 'seconds': time.perf_counter() - start}
+
+
+def save_png(image, output_path, max_bytes=MAX_SKIN_BYTES, stream=False):
+    """Write `image` to `output_path` within the byte budget and return its stats.
+
+    With `stream` the first, default encode goes straight to the file
+    instead of through an in-memory buffer; since almost every skin fits at
+    the defaults, that is usually the only encode.
+    """
+    if stream:
+        stats = _stream(image, output_path, max_bytes)
+        if stats is not None:
+            stats['path'] = output_path
+            _last.stats = stats
+            return stats
+
+    with profiling.stage('encode'):
+        data, stats = encode_png(image, max_bytes)
+    with profiling.stage('write', bytes=len(data)):
+        with open(output_path, 'wb') as f:
+            f.write(data)
+    stats['path'] = output_path
+    _last.stats = stats
+    return stats
+
+
+def last_stats():
+    """Stats from the most recent save_png call on this thread, or None."""
+    return getattr(_last, 'stats', None)
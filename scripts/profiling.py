@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Render Profiling
+
+Per-stage instrumentation for the render pipeline. Each stage records wall
+time and CPU time. With allocation tracing on it also records:
+
+- ``alloc_peak_bytes``: the peak of Python and NumPy memory (tracemalloc)
+  during the stage, above what was in use when it started.
+- ``image_bytes``: the total size of the pixel buffers Pillow created during
+  the stage. tracemalloc cannot see these. Decoded files and images that
+  share memory with a NumPy array are not counted. Counting wraps Pillow's
+  private ``Image.Image._new``; on a Pillow without it, events carry only
+  ``alloc_peak_bytes``.
+
+Peaks come from tracemalloc's process-wide counter. With several threads
+rendering at once, a stage's peak also includes the other threads.
+
+Profiling is off by default; every hook then returns immediately. When
+enabled, events are kept in memory and can be written as a Chrome trace
+(load it in chrome://tracing or https://ui.perfetto.dev) or as JSON lines.
+
+Generators report through the render helpers: `render.canvas_size` opens
+the "skin" and "draw" stages and `render.save_skin` closes them around the
+"mask", "encode" and "write" stages. Template decodes and logo processing
+show up as "template_load" and "logo".
+"""
+
+from PIL import Image
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+ENABLED = False
+
+_events = []
+_events_lock = threading.Lock()
+_local = threading.local()
+_clock_offset_ns = 0
+
+# Stages currently open in this process, for propagating tracemalloc peaks
+_active = []
+_active_lock = threading.Lock()
+_pillow_new = None
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _image_bytes(image):
+    """Size of a Pillow image's pixel buffer."""
+    mode = image.mode
+    if mode in ('1', 'L', 'P'):
+        per_pixel = 1
+    elif mode.startswith('I;16'):
+        per_pixel = 2
+    else:
+        # Multi-band 8-bit modes are stored as 4 bytes per pixel, like I and F
+        per_pixel = 4
+    return image.width * image.height * per_pixel
+
+
+def _counting_new(self, im):
+    new = _pillow_new(self, im)
+    if not im.readonly:
+        _local.image_bytes = getattr(_local, 'image_bytes', 0) + _image_bytes(new)
+    return new
+
+
+def _sample_peak():
+    """Fold tracemalloc's peak since the last sample into every open stage and reset it.
+
+    Call with _active_lock held.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    for open_stage in _active:
+        open_stage.peak = max(open_stage.peak, peak)
+    tracemalloc.reset_peak()
+    return current
+
+
+class _Stage:
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.tracing = False
+
+    def __enter__(self):
+        self.wall = time.perf_counter_ns()
+        self.cpu = time.thread_time_ns()
+        if tracemalloc.is_tracing():
+            self.tracing = True
+            self.images = getattr(_local, 'image_bytes', 0)
+            with _active_lock:
+                self.start = self.peak = _sample_peak()
+                _active.append(self)
+        return self
+
+    def __exit__(self, *exc):
+        event = {
+            'name': self.name,
+            'start_ns': self.wall + _clock_offset_ns,
+            'wall_ns': time.perf_counter_ns() - self.wall,
+            'cpu_ns': time.thread_time_ns() - self.cpu,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': self.args,
+        }
+        if self.tracing:
+            with _active_lock:
+                if tracemalloc.is_tracing():
+                    _sample_peak()
+                if self in _active:
+                    _active.remove(self)
+            event['alloc_peak_bytes'] = self.peak - self.start
+            if _pillow_new is not None:
+                event['image_bytes'] = getattr(_local, 'image_bytes', 0) - self.images
+        with _events_lock:
+            _events.append(event)
+        return False
+
+
+def enable(trace_allocations=False):
+    """Start recording stages.
+
+    `trace_allocations` also turns on tracemalloc and counts the image
+    buffers Pillow creates. The count hooks Pillow's private
+    `Image.Image._new`; if a Pillow version lacks it, only tracemalloc runs.
+    """
+    global ENABLED, _clock_offset_ns, _pillow_new
+    # Timestamps are wall-clock aligned so traces from worker processes line up
+    _clock_offset_ns = time.time_ns() - time.perf_counter_ns()
+    if trace_allocations:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if _pillow_new is None and callable(getattr(Image.Image, '_new', None)):
+            # Every Pillow operation that returns a new image goes through _new
+            _pillow_new = Image.Image._new
+            Image.Image._new = _counting_new
+    ENABLED = True
+
+
+def disable():
+    global ENABLED, _pillow_new
+    ENABLED = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    if _pillow_new is not None:
+        Image.Image._new = _pillow_new
+        _pillow_new = None
+
+
+def stage(name, **args):
+    """Context manager timing one stage."""
+    if not ENABLED:
+        return _NULL_STAGE
+    return _Stage(name, args)
+
+
+def begin(name, **args):
+    """Open a stage that a later `end(name)` on the same thread closes."""
+    if not ENABLED:
+        return
+    stack = getattr(_local, 'open', None)
+    if stack is None:
+        stack = _local.open = []
+    if name == 'skin':
+        # A generator that raised mid-render leaves its stages open; drop them
+        stack.clear()
+    stack.append(_Stage(name, args).__enter__())
+
+
+def end(name, **args):
+    """Close the innermost open stage called `name`, merging in `args`."""
+    if not ENABLED:
+        return
+    stack = getattr(_local, 'open', [])
+    for index in range(len(stack) - 1, -1, -1):
+        if stack[index].name == name:
+            open_stage = stack.pop(index)
+            open_stage.args.update(args)
+            open_stage.__exit__(None, None, None)
+            return
+
+
+def drain():
+    """Return and forget every recorded event."""
+    with _events_lock:
+        events = list(_events)
+        _events.clear()
+    return events
+
+
+def write_trace(path, events=None):
+    """Write events as a Chrome trace, or as JSON lines if `path` ends in .jsonl.
+
+    `events` defaults to everything recorded so far in this process.
+    """
+    events = drain() if events is None else events
+    if path.endswith('.jsonl'):
+        with open(path, 'w') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+        return path
+
+    trace = []
+    for event in events:
+        args = dict(event['args'], cpu_ms=event['cpu_ns'] / 1e6)
+        for key in ('alloc_peak_bytes', 'image_bytes'):
+            if key in event:
+                args[key] = event[key]
+        trace.append({
+            'name': event['name'], 'ph': 'X', 'cat': 'render',
+            'ts': event['start_ns'] / 1000, 'dur': event['wall_ns'] / 1000,
+            'pid': event['pid'], 'tid': event['tid'], 'args': args,
+        })
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+    return path
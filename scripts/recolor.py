@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Palette Recoloring
+
+Produces color variants of a flat-color design without redrawing it. The
+design is rasterized once into palette indices - one per color slot and
+anti-aliased mask level - so each new color scheme only rebuilds a
+256-entry palette and encodes the image.
+
+Example:
+
+    design = recolor.IndexedDesign.from_generator(
+        generate_skin.create_racing_stripes,
+        {'base_color': (30, 30, 30, 255), 'stripe_color': (255, 255, 255, 255)})
+    design.save('racing_stripes_gold', base_color=(0, 0, 0, 255), stripe_color=(212, 175, 55, 255))
+
+Only the color arguments change between variants; gradients, logos and
+other non-flat content cannot be recolored this way.
+"""
+
+from PIL import Image
+import os
+import sys
+
+import numpy as np
+
+import png_encoder
+import render
+import template_cache
+
+# Upper bound on anti-aliasing levels kept from the template mask edges
+MAX_MASK_LEVELS = 32
+
+WHITE = np.asarray(render.WHITE, dtype=np.float64)
+
+
+def _slot_color(slot):
+    """Distinctive stand-in color used to find a slot's pixels in the layer."""
+    return (1 + slot * 7, 251 - slot * 5, 113 + slot * 3, 255)
+
+
+def _flatten(color_args):
+    """Color argument values (single colors or lists of colors) as a flat slot list."""
+    slots = []
+    for value in color_args.values():
+        if isinstance(value, list):
+            slots.extend(value)
+        else:
+            slots.append(value)
+    return [tuple(color) + (255,) * (4 - len(color)) for color in slots]
+
+
+def _substitute(color_args):
+    """Replace every color in `color_args` with its slot's stand-in color."""
+    substituted = {}
+    slot = 0
+    for name, value in color_args.items():
+        if isinstance(value, list):
+            substituted[name] = [_slot_color(slot + i) for i in range(len(value))]
+            slot += len(value)
+        else:
+            substituted[name] = _slot_color(slot)
+            slot += 1
+    return substituted
+
+
+class IndexedDesign:
+    """A design rasterized once as color-slot indices plus the template mask."""
+
+    def __init__(self, slot_map, mask, color_args, output_dir):
+        slot_count = len(_flatten(color_args))
+        self.color_args = color_args
+        self.output_dir = output_dir
+        self.levels = min(MAX_MASK_LEVELS, 256 // slot_count)
+        if self.levels < 2:
+            raise ValueError(f'Too many color slots ({slot_count}) for a 256-color palette')
+
+        # Palette index = slot * levels + quantized mask level
+        mask_level = (np.asarray(mask, dtype=np.uint16) * (self.levels - 1) + 127) // 255
+        self.indices = (slot_map.astype(np.uint16) * self.levels + mask_level).astype(np.uint8)
+
+    @classmethod
+    def from_generator(cls, generator, color_args, **params):
+        """Rasterize `generator` once with its color arguments swapped for slot colors.
+
+        `color_args` maps argument names to a color or a list of colors; its
+        structure is what `render` and `save` take later.
+        """
+        with render.capture() as captured:
+            generator(**_substitute(color_args), **params)
+        if len(captured) != 1:
+            raise ValueError(f'{generator.__name__} saved {len(captured)} layers; expected one')
+        entry = captured[0]
+        if entry['keep_outlines']:
+            raise ValueError(f'{generator.__name__} keeps template outlines and cannot be palette-indexed')
+
+        layer = np.asarray(entry['layer'].convert('RGBA'))
+        template = template_cache.get_template(entry['template_path'])
+        if entry['layer'].size != template.size:
+            raise ValueError('Multi-template resampling is not supported for indexed designs')
+
+        slot_map = np.full(layer.shape[:2], 255, dtype=np.uint8)
+        for slot in range(len(_flatten(color_args))):
+            slot_map[np.all(layer == _slot_color(slot), axis=2)] = slot
+
+        mask = np.asarray(template.mask)
+        stray = (slot_map == 255) & (mask > 0)
+        if stray.any():
+            raise ValueError(f'{generator.__name__} draws {int(stray.sum())} pixels that do not come '
+                             'from its color arguments; the design is not flat')
+        slot_map[slot_map == 255] = 0
+        return cls(slot_map, mask, color_args, sys.modules[generator.__module__].OUTPUT_DIR)
+
+    def palette(self, **color_args):
+        """RGBA palette for a color scheme with the same structure as the design's color_args."""
+        scheme = dict(self.color_args, **color_args)
+        colors = np.asarray(_flatten(scheme), dtype=np.float64)
+        coverage = np.arange(self.levels, dtype=np.float64) / (self.levels - 1)
+        # Each slot fades from white (outside the panels) to its color
+        entries = WHITE + (colors[:, np.newaxis, :] - WHITE) * coverage[np.newaxis, :, np.newaxis]
+        entries = (entries.reshape(-1, 4) + 0.5).astype(np.uint8)
+        padding = np.zeros((256 - len(entries), 4), dtype=np.uint8)
+        return np.concatenate([entries, padding])
+
+    def render(self, **color_args):
+        """Return the finished skin for a color scheme as a P-mode image."""
+        height, width = self.indices.shape
+        image = Image.frombytes('P', (width, height), self.indices.tobytes())
+        image.putpalette(self.palette(**color_args).tobytes(), rawmode='RGBA')
+        return image
+
+    def save(self, output_name, output_dir=None, **color_args):
+        """Write one color variant as `<output_name>.png` and return the path."""
+        output_dir = output_dir if output_dir is not None else self.output_dir
+        output_path = os.path.join(output_dir, f'{output_name}.png')
+        png_encoder.save_png(self.render(**color_args), output_path)
+        print(f'Created: {output_path}')
+        return output_path
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Skin Rendering
+
+The final step shared by every generator: mask a design layer with a vehicle
+template and write the PNG.
+
+By default a skin is rendered against the generator's own template. Calling
+`set_target_templates` switches to multi-template mode: generators draw
+their design once at the largest template size, and only the mask and
+composite step is repeated per trim, writing into ``<output_dir>/<trim>/``.
+Designs laid out on the template's own panels go through
+`save_skin_per_template` instead, which draws them once per trim.
+
+Inside a `capture()` block nothing is masked or written; the design layers
+generators hand to `save_skin` are collected instead.
+
+`set_low_memory(True)` bounds what a render holds: generators draw into one
+reused canvas per thread (`new_canvas`), `save_skin` masks that canvas in
+place instead of compositing onto a fresh one, and the PNG encoder writes
+straight to the output file. A render then holds about one full-size RGBA
+buffer plus whatever its design step allocates.
+"""
+
+from PIL import Image
+import contextlib
+import functools
+import os
+import threading
+import time
+
+import png_encoder
+import profiling
+import template_cache
+
+WHITE = (255, 255, 255, 255)
+
+# Templates to render against; None means each generator's own template
+TARGET_TEMPLATES = None
+
+# Reuse one canvas per thread and mask it in place; see set_low_memory
+LOW_MEMORY = False
+# Rows per band when masking in place
+MASK_BAND_ROWS = 64
+
+_last = threading.local()
+
+
+def set_target_templates(template_paths):
+    """Render every skin against `template_paths` (None restores single-template mode)."""
+    global TARGET_TEMPLATES
+    TARGET_TEMPLATES = list(template_paths) if template_paths is not None else None
+
+
+def set_low_memory(enabled):
+    """Switch the single-buffer render mode on or off for this process."""
+    global LOW_MEMORY
+    LOW_MEMORY = bool(enabled)
+
+
+def new_canvas(size, color=(0, 0, 0, 0)):
+    """An RGBA design canvas of `size` filled with `color`.
+
+    In low-memory mode this is the thread's reused canvas, cleared to
+    `color`, so a generator may hold only one at a time and must not keep
+    it after save_skin. Inside capture() every call returns a new image,
+    since captured layers outlive the render.
+    """
+    if not LOW_MEMORY or getattr(_last, 'capture', None) is not None:
+        return Image.new('RGBA', size, color)
+    canvas = getattr(_last, 'canvas', None)
+    if canvas is None or canvas.size != tuple(size):
+        # Release the old canvas first so two are never alive at once
+        canvas = _last.canvas = None
+        canvas = _last.canvas = Image.new('RGBA', size, color)
+    else:
+        canvas.paste(color, (0, 0) + canvas.size)
+    return canvas
+
+
+def canvas_size(template_path):
+    """Size the design layer should be drawn at.
+
+    Generators call this first, so it also opens their profiling stages.
+    """
+    profiling.begin('skin')
+    paths = TARGET_TEMPLATES or [template_path]
+    sizes = [template_cache.get_template(path).size for path in paths]
+    profiling.begin('draw')
+    return max(sizes, key=lambda size: size[0] * size[1])
+
+
+@functools.lru_cache(maxsize=8)
+def _white_band(width):
+    return Image.new('RGBA', (width, MASK_BAND_ROWS), WHITE)
+
+
+def _paste_white(layer, template):
+    """Paste white over everything outside the template's panels, a band of rows at a time.
+
+    White is pasted as an image, not a color: pasting a color blends alpha
+    differently and would change translucent designs.
+    """
+    white = _white_band(layer.width)
+    for box, mask in template.inverted_mask_bands(MASK_BAND_ROWS):
+        band = white if mask.height == MASK_BAND_ROWS else white.crop((0, 0) + mask.size)
+        layer.paste(band, box, mask)
+
+
+def apply_template(layer, template_path, keep_outlines=False, in_place=False):
+    """Mask a design layer with a template and return the finished skin.
+
+    Layers drawn at another resolution are resampled to the template size.
+    With `keep_outlines` the template's own pixels show through outside the
+    panels; otherwise the area outside the panels is white. With `in_place`
+    an RGBA layer is masked where it is and returned, saving a full-size
+    buffer; the result is the same.
+    """
+    template = template_cache.get_template(template_path)
+    if layer.size != template.size:
+        layer = layer.resize(template.size, Image.Resampling.LANCZOS)
+        # The resampled copy is ours to overwrite
+        in_place = True
+
+    if in_place and layer.mode == 'RGBA':
+        # Paste the outside over the design rather than the design over the outside
+        if keep_outlines:
+            layer.paste(template.image, mask=template.inverted_red_mask)
+        else:
+            _paste_white(layer, template)
+        return layer
+
+    if keep_outlines:
+        return Image.composite(layer, template.image, template.red_mask)
+
+    final = Image.new('RGBA', template.size, WHITE)
+    final.paste(layer, mask=template.mask)
+    return final
+
+
+def _write(final, output_dir, output_name):
+    output_path = os.path.join(output_dir, f'{output_name}.png')
+    png_encoder.save_png(final, output_path, stream=LOW_MEMORY)
+    print(f'Created: {output_path}')
+    return output_path
+
+
+def save_skin_per_template(draw, output_name, output_dir, template_path, keep_outlines=False):
+    """Draw and save a design that depends on the template it is rendered for.
+
+    `draw(template_path, size)` returns the design layer for one template,
+    e.g. one built from that template's panel index. In multi-template mode
+    it is called once per trim, because the trims' panels differ and one
+    drawing cannot be masked for all of them. Returns what save_skin does.
+    """
+    global TARGET_TEMPLATES
+    targets = TARGET_TEMPLATES
+    if targets is None:
+        layer = draw(template_path, canvas_size(template_path))
+        return save_skin(layer, output_name, output_dir, template_path, keep_outlines)
+
+    output_paths = []
+    try:
+        for path in targets:
+            TARGET_TEMPLATES = [path]
+            layer = draw(path, canvas_size(path))
+            paths = save_skin(layer, output_name, output_dir, path, keep_outlines)
+            if paths is not None:
+                output_paths.extend(paths)
+    finally:
+        TARGET_TEMPLATES = targets
+    return output_paths if output_paths else None
+
+
+@contextlib.contextmanager
+def capture():
+    """Collect the layers generators pass to save_skin instead of writing skins.
+
+    Yields a list that receives one dict per save_skin call, with the
+    unmasked "layer" and the "output_name", "template_path" and
+    "keep_outlines" it was saved with. save_skin returns None meanwhile.
+    """
+    previous = getattr(_last, 'capture', None)
+    captured = _last.capture = []
+    try:
+        yield captured
+    finally:
+        _last.capture = previous
+
+
+def last_timings():
+    """Seconds spent masking and encoding in the last save_skin call on this thread."""
+    return getattr(_last, 'timings', None)
+
+
+def save_skin(layer, output_name, output_dir, template_path, keep_outlines=False):
+    """Mask `layer`, write it as `<output_name>.png` and return the path.
+
+    In multi-template mode one file is written per trim and the list of
+    paths is returned instead. In low-memory mode `layer` is masked in place
+    for the last (or only) template, so it is unusable afterwards.
+    """
+    profiling.end('draw')
+    captured = getattr(_last, 'capture', None)
+    if captured is not None:
+        captured.append({'layer': layer, 'output_name': output_name,
+                         'template_path': template_path, 'keep_outlines': keep_outlines})
+        profiling.end('skin', output=output_name)
+        return None
+
+    timings = {'mask': 0.0, 'encode': 0.0}
+    _last.timings = timings
+
+    output_paths = []
+    template_paths = TARGET_TEMPLATES or [template_path]
+    for i, path in enumerate(template_paths):
+        trim_dir = output_dir
+        if TARGET_TEMPLATES is not None:
+            trim_dir = os.path.join(output_dir, template_cache.trim_name(path))
+            os.makedirs(trim_dir, exist_ok=True)
+
+        start = time.perf_counter()
+        with profiling.stage('mask', template=template_cache.trim_name(path)):
+            in_place = LOW_MEMORY and i == len(template_paths) - 1
+            final = apply_template(layer, path, keep_outlines, in_place)
+        masked = time.perf_counter()
+        output_paths.append(_write(final, trim_dir, output_name))
+        timings['mask'] += masked - start
+        timings['encode'] += time.perf_counter() - masked
+
+    profiling.end('skin', output=output_name)
+    return output_paths if TARGET_TEMPLATES is not None else output_paths[0]
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Local Render Service
+
+A long-running HTTP server for on-demand skin previews. Worker processes
+import the generators and decode the templates once, and keep processed
+logos in memory after first use, so a request only pays for drawing,
+masking and encoding. Identical requests that arrive while a render is in
+flight share that render, and finished PNGs are kept in a bounded LRU cache.
+
+Usage: python render_service.py [--host 127.0.0.1] [--port 8765] [--workers N] [--cache-mb 64]
+
+Endpoints:
+
+    GET  /generators               generator names and their parameters
+    GET  /render/<generator>?...   render a skin; each query value is JSON
+                                   (color=[255,0,0]) or a plain string
+    POST /render/<generator>       the same, with a JSON object body
+    GET  /stats                    cache and coalescing counters
+
+Pass `trim=performance` (or another template folder name) to render against
+another template. Nothing is written to disk.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+import argparse
+import asyncio
+import hashlib
+import inspect
+import json
+
+import batch_render
+import png_encoder
+import render
+import template_cache
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_BYTES = 64 * 2**20
+MAX_BODY_BYTES = 64 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+def _init_worker():
+    """Import the generators and decode every template once per worker."""
+    for path in template_cache.available_templates():
+        template_cache.get_template(path)
+
+
+def render_png(generator_name, params, template_path):
+    """Render one skin in memory and return the encoded PNG bytes."""
+    generator = batch_render.available_generators()[generator_name]
+    module = inspect.getmodule(generator)
+    template_path = template_path or module.TEMPLATE_PATH
+
+    render.set_target_templates([template_path])
+    try:
+        with render.capture() as captured:
+            generator(**params)
+    finally:
+        render.set_target_templates(None)
+
+    entry = captured[-1]
+    # The captured layer is this call's own, so it can be masked in place
+    final = render.apply_template(entry['layer'], template_path, entry['keep_outlines'], in_place=True)
+    data, _ = png_encoder.encode_png(final)
+    return data
+
+
+class PngCache:
+    """LRU cache of encoded PNGs, bounded by total bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self.bytes -= len(self._entries.pop(key))
+        self._entries[key] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_value(value):
+    """Query values are JSON when they parse as JSON, plain strings otherwise."""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class RenderService:
+    """Request handling, coalescing and caching around a render worker pool."""
+
+    def __init__(self, workers=None, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.generators = batch_render.available_generators()
+        self.templates = {}
+        for path in template_cache.available_templates():
+            # Accept both 'modely-2025-performance' and 'performance'
+            trim = template_cache.trim_name(path)
+            self.templates[trim] = self.templates[trim.rsplit('-', 1)[-1]] = path
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        self.cache = PngCache(cache_bytes)
+        self.inflight = {}
+        self.stats = {'requests': 0, 'renders': 0, 'cache_hits': 0, 'coalesced': 0, 'errors': 0}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def describe_generators(self):
+        described = {}
+        for name, fn in sorted(self.generators.items()):
+            params = {}
+            for param in inspect.signature(fn).parameters.values():
+                if param.name == 'output_name':
+                    continue
+                default = None if param.default is inspect.Parameter.empty else param.default
+                params[param.name] = {'required': param.default is inspect.Parameter.empty, 'default': default}
+            described[name] = {'doc': inspect.getdoc(fn), 'params': params}
+        return described
+
+    def _request_key(self, name, params, template_path):
+        payload = json.dumps([name, params, template_path], sort_keys=True, default=list)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    async def _result(future):
+        """Await a render shared by every coalesced request.
+
+        Bad-parameter errors become a 400 for every waiter, not only the
+        first request.
+        """
+        try:
+            return await asyncio.shield(future)
+        except (TypeError, ValueError) as e:
+            raise HttpError(400, f'{type(e).__name__}: {e}') from None
+
+    async def render(self, name, params):
+        """Return (PNG bytes, how it was served: 'hit', 'coalesced' or 'miss')."""
+        if name not in self.generators:
+            raise HttpError(404, f'Unknown generator {name!r}')
+        params = batch_render.tuplify(dict(params))
+        # Nothing is written, but some generators require an output name
+        params['output_name'] = 'preview'
+        trim = params.pop('trim', None)
+        if trim is not None and trim not in self.templates:
+            raise HttpError(400, f'Unknown trim {trim!r}; choose from {", ".join(sorted(self.templates))}')
+        template_path = self.templates.get(trim)
+        try:
+            inspect.signature(self.generators[name]).bind(**params)
+        except TypeError as e:
+            raise HttpError(400, str(e))
+
+        key = self._request_key(name, params, template_path)
+        data = self.cache.get(key)
+        if data is not None:
+            self.stats['cache_hits'] += 1
+            return data, 'hit'
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await self._result(future), 'coalesced'
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, render_png, name, params, template_path)
+        self.inflight[key] = future
+        self.stats['renders'] += 1
+        try:
+            data = await self._result(future)
+        finally:
+            del self.inflight[key]
+        self.cache.put(key, data)
+        return data, 'miss'
+
+    async def handle_request(self, method, target, body):
+        """Return (status, content type, body bytes, extra headers)."""
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+
+        if path == '/generators' and method == 'GET':
+            return 200, 'application/json', json.dumps(self.describe_generators()).encode(), {}
+        if path == '/stats' and method == 'GET':
+            stats = dict(self.stats, cached_pngs=len(self.cache), cached_bytes=self.cache.bytes,
+                         inflight=len(self.inflight))
+            return 200, 'application/json', json.dumps(stats).encode(), {}
+        if path.startswith('/render/'):
+            if method not in ('GET', 'POST'):
+                raise HttpError(405, f'{method} not allowed')
+            params = {key: _parse_value(value) for key, value in parse_qsl(url.query)}
+            if body:
+                try:
+                    posted = json.loads(body)
+                except ValueError as e:
+                    raise HttpError(400, f'Body is not JSON: {e}')
+                if not isinstance(posted, dict):
+                    raise HttpError(400, 'Body must be a JSON object of generator parameters')
+                params.update(posted)
+            data, served = await self.render(path[len('/render/'):], params)
+            return 200, 'image/png', data, {'X-Render-Cache': served}
+        raise HttpError(404, f'No such endpoint: {path or "/"}')
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client is done."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                self.stats['requests'] += 1
+                try:
+                    try:
+                        length = int(headers.get('content-length', 0))
+                    except ValueError:
+                        raise HttpError(400, f'Bad Content-Length {headers["content-length"]!r}') from None
+                    if length < 0:
+                        raise HttpError(400, f'Bad Content-Length {length}')
+                    if length > MAX_BODY_BYTES:
+                        raise HttpError(413, f'Body over {MAX_BODY_BYTES} bytes')
+                    body = await reader.readexactly(length) if length else b''
+                    status, content_type, payload, extra = await self.handle_request(method, target, body)
+                except HttpError as e:
+                    self.stats['errors'] += 1
+                    status, content_type, extra = e.status, 'application/json', {}
+                    payload = json.dumps({'error': str(e)}).encode()
+                except Exception as e:
+                    self.stats['errors'] += 1
+                    status, content_type, extra = 500, 'application/json', {}
+                    payload = json.dumps({'error': f'{type(e).__name__}: {e}'}).encode()
+
+                head = [f'HTTP/1.1 {status} {REASONS[status]}',
+                        f'Content-Type: {content_type}',
+                        f'Content-Length: {len(payload)}',
+                        f'Connection: {"keep-alive" if keep_alive else "close"}']
+                head += [f'{name}: {value}' for name, value in extra.items()]
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, workers=None, cache_bytes=DEFAULT_CACHE_BYTES):
+    service = RenderService(workers, cache_bytes)
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    print(f'Serving {len(service.generators)} generators on http://{host}:{port}/')
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve skin renders over local HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='interface to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: CPU count)')
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_BYTES / 2**20,
+                        help='memory for cached PNGs, in MB')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, int(args.cache_mb * 2**20)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Layered Scenes
+
+A scene is an ordered stack of layers (base fill, gradients, shapes, logos)
+composited and then masked with a template. Every layer knows its bounding
+box, so changing one layer only recomposites the region it covered before
+and after the change. That makes logo placement sweeps and interactive
+tweaks much cheaper than full re-renders:
+
+    scene = ferrari_f1_sponsors.sponsored_v2_scene()
+    for x in range(0, 200, 20):
+        scene.update('shell_left', position=(x, 560))
+        scene.save(f'shell_sweep_{x}')
+"""
+
+from PIL import Image, ImageDraw
+import math
+import os
+
+import gradients
+import png_encoder
+import render
+import template_cache
+
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'skins')
+
+
+class Layer:
+    """One scene layer: the image `build(**params)` placed at `position`.
+
+    In 'replace' mode the layer's pixels overwrite what is below, like
+    ImageDraw fills; in 'mask' mode its alpha channel is the paste mask,
+    like pasting a logo onto itself. Layers whose position follows from
+    their parameters (shapes in canvas coordinates) pass `locate`.
+    """
+
+    def __init__(self, name, build, position=(0, 0), mode='replace', locate=None, **params):
+        if mode not in ('replace', 'mask'):
+            raise ValueError(f'Unknown layer mode {mode!r}')
+        self.name = name
+        self.build = build
+        self.locate = locate
+        self.mode = mode
+        self.params = params
+        self.position = tuple(locate(**params) if locate else position)
+        self.image = build(**params)
+
+    @property
+    def bbox(self):
+        x, y = self.position
+        return (x, y, x + self.image.width, y + self.image.height)
+
+
+def fill_layer(name, size, color):
+    """Full-canvas solid color."""
+    return Layer(name, lambda color: Image.new('RGBA', size, color), color=color)
+
+
+def gradient_layer(name, size, stops, angle=90, position=(0, 0)):
+    """Linear gradient of `size` at `position`; replaces what is below, alpha included."""
+    return Layer(name, lambda stops, angle: gradients.linear_gradient(size, stops, angle),
+                 position, stops=stops, angle=angle)
+
+
+def _draw_shapes(shapes, origin):
+    """Rasterize ImageDraw shapes into an image that starts at `origin`."""
+    ox, oy = origin
+    xs = [x for _, points, _ in shapes for x in points[0::2]]
+    ys = [y for _, points, _ in shapes for y in points[1::2]]
+    image = Image.new('RGBA', (math.ceil(max(xs)) + 1 - ox, math.ceil(max(ys)) + 1 - oy))
+    draw = ImageDraw.Draw(image)
+    for kind, points, color in shapes:
+        shifted = [value - (ox if i % 2 == 0 else oy) for i, value in enumerate(points)]
+        getattr(draw, kind)(shifted, fill=color)
+    return image
+
+
+def shape_layer(name, shapes):
+    """Rectangles and polygons drawn in canvas coordinates.
+
+    `shapes` is a list of ``(kind, points, color)`` where kind is 'rectangle'
+    or 'polygon' and points is a flat ``[x0, y0, x1, y1, ...]`` list.
+    """
+    def origin(shapes):
+        return (math.floor(min(x for _, points, _ in shapes for x in points[0::2])),
+                math.floor(min(y for _, points, _ in shapes for y in points[1::2])))
+
+    return Layer(name, lambda shapes: _draw_shapes(shapes, origin(shapes)),
+                 mode='mask', locate=origin, shapes=shapes)
+
+
+def image_layer(name, image, position):
+    """A logo or other RGBA image pasted through its own alpha."""
+    return Layer(name, lambda image: image, position, 'mask', image=image)
+
+
+def _intersect(a, b):
+    box = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    return box if box[0] < box[2] and box[1] < box[3] else None
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def composite(layers, box):
+    """Composite the parts of `layers` that fall inside `box` into a new image."""
+    x0, y0, x1, y1 = box
+    tile = Image.new('RGBA', (x1 - x0, y1 - y0))
+    for layer in layers:
+        overlap = _intersect(layer.bbox, box)
+        if overlap is None:
+            continue
+        lx, ly = layer.position
+        piece = layer.image.crop((overlap[0] - lx, overlap[1] - ly, overlap[2] - lx, overlap[3] - ly))
+        offset = (overlap[0] - x0, overlap[1] - y0)
+        tile.paste(piece, offset, piece if layer.mode == 'mask' else None)
+    return tile
+
+
+class Scene:
+    """An ordered layer stack with a cached composite and masked result."""
+
+    def __init__(self, layers, template_path=template_cache.DEFAULT_TEMPLATE):
+        self.template_path = template_path
+        self.template = template_cache.get_template(template_path)
+        self.size = self.template.size
+        self.layers = list(layers)
+        self.canvas = Image.new('RGBA', self.size)
+        self.final = Image.new('RGBA', self.size, render.WHITE)
+        self._recomposite((0, 0) + self.size)
+
+    def layer(self, name):
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+        raise KeyError(name)
+
+    def update(self, name, position=None, **params):
+        """Change one layer's position and/or build parameters and recomposite its region.
+
+        Returns the dirty box that was recomposited.
+        """
+        layer = self.layer(name)
+        dirty = layer.bbox
+        if params:
+            layer.params.update(params)
+            layer.image = layer.build(**layer.params)
+            if layer.locate is not None:
+                position = layer.locate(**layer.params)
+        if position is not None:
+            layer.position = tuple(position)
+        dirty = _union(dirty, layer.bbox)
+        return self._recomposite(dirty)
+
+    def _recomposite(self, box):
+        """Rebuild the composite and masked result inside `box` only."""
+        box = _intersect(box, (0, 0) + self.size)
+        if box is None:
+            return None
+        x0, y0 = box[:2]
+        tile = composite(self.layers, box)
+        self.canvas.paste(tile, (x0, y0))
+
+        masked = Image.new('RGBA', tile.size, render.WHITE)
+        masked.paste(tile, mask=self.template.mask.crop(box))
+        self.final.paste(masked, (x0, y0))
+        return box
+
+    def flatten(self):
+        """Copy of the unmasked composite, e.g. for render.save_skin."""
+        return self.canvas.copy()
+
+    def save(self, output_name, output_dir=None):
+        """Write the current masked scene as `<output_name>.png`."""
+        output_dir = output_dir if output_dir is not None else OUTPUT_DIR
+        output_path = os.path.join(output_dir, f'{output_name}.png')
+        png_encoder.save_png(self.final, output_path)
+        print(f'Created: {output_path}')
+        return output_path
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Skin Similarity Index
+
+Gives every skin a bit-packed color-layout hash and keeps the hashes in a
+persistent index, so near-duplicate and "similar to this" queries are a
+Hamming search instead of image comparisons. Entries are keyed by file hash
+and only new or changed files are decoded.
+
+Skins are mostly flat color on a shared panel outline, so a grayscale DCT
+hash sees little but the outline and flips bits at random on flat designs.
+Instead each skin is masked with the template it was made for (the one
+whose panels its content matches best) and described by what is inside the
+panels: the share of the panel area in each color bin, how much fine detail
+there is, and a coarse brightness layout. Each value is thermometer-coded
+(a level of n sets the first n bits), so the Hamming distance between two
+hashes adds up how far apart the values are.
+
+That coding costs a bit per level rather than per value: 64 color bins at
+15 bits, 5 detail bands at 63 and 16 layout cells at 3 make HASH_BITS 1323,
+or 21 64-bit words. Binary-coding the same values would take a quarter of
+that, but then a one-level change could flip several bits and Hamming
+distance would no longer track how different two skins are. Each entry
+stores that hash and its inverted twin (about 330 bytes), so an index of
+10,000 skins is a few MB and a query is a 21-word XOR and popcount per
+skin.
+
+Recolors often swap light and dark (white stripes on black vs red on
+white), so every skin also gets the hash of its brightness-inverted design,
+and distances count the closer of the two unless --no-inverted is given.
+
+Usage: python similarity.py [PATH ...] [--threshold 18] [--no-inverted]
+       python similarity.py [PATH ...] --like SKIN [-k 5]
+
+PATHs are skins or directories of skins (default: skins/ and examples/).
+"""
+
+from PIL import Image
+import argparse
+import functools
+import json
+import os
+import sys
+
+import numpy as np
+
+import asset_cache
+import template_cache
+
+REPO_DIR = os.path.join(os.path.dirname(__file__), '..')
+INDEX_PATH = os.path.join(REPO_DIR, '.cache', 'similarity_index.json')
+INDEX_VERSION = 3
+
+# Resolution skins are hashed at; fine enough that little of the outline
+# blurs into the panels
+SAMPLE_SIZE = 256
+# Color bins per YCbCr channel; each bin's share of the panel area is coded
+# in 1/32 steps up to PALETTE_CAP
+PALETTE_BINS = 4
+PALETTE_LEVELS = 16
+PALETTE_CAP = 0.5
+# Bands of luma change between neighbouring pixels; each band's share is
+# coded in 1/64 steps, so detail weighs about as much as color
+DETAIL_EDGES = (0, 2, 8, 24, 64, 256)
+DETAIL_LEVELS = 64
+# Coarse brightness layout: mean luma of each cell of a LAYOUT_GRID square grid
+LAYOUT_GRID = 4
+LAYOUT_LEVELS = 4
+HASH_BITS = (PALETTE_BINS ** 3 * (PALETTE_LEVELS - 1) + (len(DETAIL_EDGES) - 1) * (DETAIL_LEVELS - 1)
+             + LAYOUT_GRID ** 2 * (LAYOUT_LEVELS - 1))
+HASH_WORDS = -(-HASH_BITS // 64)
+# A skin is masked with the best-matching template only if its content
+# covers that template's panels this well (intersection over union);
+# otherwise, e.g. for a mostly white design, the generators' default is used
+TEMPLATE_MATCH = 0.5
+# Hamming distance treated as a near-duplicate; tuned on skins/ and
+# examples/. The Ferrari liveries sit 6-18 bits apart, and matte black and
+# the two racing stripe skins (light/dark recolors of one layout) 6-14, so
+# both families are flagged. The closest pair across families is 19 bits
+# and every example is 32 or more from everything else
+DUPLICATE_THRESHOLD = 18
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+@functools.lru_cache(maxsize=None)
+def _template_masks(size):
+    """Panel masks of every template at `size` x `size`, the default first."""
+    paths = [template_cache.DEFAULT_TEMPLATE]
+    paths += [path for path in template_cache.available_templates()
+              if os.path.abspath(path) != os.path.abspath(template_cache.DEFAULT_TEMPLATE)]
+    masks = []
+    for path in paths:
+        mask = template_cache.load_mask(path).resize((size, size), Image.Resampling.BOX)
+        masks.append(np.asarray(mask) >= 128)
+    return masks
+
+
+def _panel_mask(rgb, alpha):
+    """Panel mask of the template whose panels the skin's content fills best."""
+    masks = _template_masks(alpha.shape[0])
+    # Content is whatever is opaque and not the white left outside the panels
+    content = (alpha >= 128) & (rgb.min(axis=2) < 245)
+    scores = [(content & mask).sum() / max(1, (content | mask).sum()) for mask in masks]
+    best = int(np.argmax(scores))
+    return masks[best] if scores[best] >= TEMPLATE_MATCH else masks[0]
+
+
+def _thermometer(values, levels):
+    """Code values in [0, 1] as `levels` - 1 bits each: level n sets the first n bits."""
+    steps = np.clip(np.floor(np.ravel(values) * levels), 0, levels - 1)
+    return (np.arange(levels - 1)[np.newaxis, :] < steps[:, np.newaxis]).ravel()
+
+
+def _pack(bits):
+    """Pack a bool array of HASH_BITS bits into an int."""
+    padded = np.zeros(HASH_WORDS * 64, dtype=bool)
+    padded[:len(bits)] = bits
+    return int.from_bytes(np.packbits(padded).tobytes(), 'big')
+
+
+def _hash_bits(ycc, inside):
+    """Palette, detail and layout bits of a YCbCr image within `inside`."""
+    pixels = ycc[inside]
+    bins = np.clip((pixels * (PALETTE_BINS / 256)).astype(np.int64), 0, PALETTE_BINS - 1)
+    codes = (bins[:, 0] * PALETTE_BINS + bins[:, 1]) * PALETTE_BINS + bins[:, 2]
+    palette = np.bincount(codes, minlength=PALETTE_BINS ** 3) / len(pixels)
+
+    # Luma change to the right and below, where both pixels are on a panel
+    luma = ycc[..., 0]
+    change = np.abs(np.diff(luma, axis=1))[:-1] + np.abs(np.diff(luma, axis=0))[:, :-1]
+    both = inside[:-1, :-1] & inside[1:, :-1] & inside[:-1, 1:]
+    detail = np.histogram(np.clip(change[both], 0, 255), bins=DETAIL_EDGES)[0] / max(1, both.sum())
+
+    # Cells with little panel in them take the overall mean
+    cell = luma.shape[0] // LAYOUT_GRID
+    shape = (LAYOUT_GRID, cell, LAYOUT_GRID, cell)
+    count = inside.reshape(shape).sum(axis=(1, 3))
+    total = np.where(inside, luma, 0).reshape(shape).sum(axis=(1, 3))
+    layout = np.where(count > 0.1 * cell * cell, total / np.maximum(count, 1), pixels[:, 0].mean())
+
+    return np.concatenate([
+        _thermometer(np.minimum(palette / PALETTE_CAP, 1), PALETTE_LEVELS),
+        _thermometer(detail, DETAIL_LEVELS),
+        _thermometer(layout / 256, LAYOUT_LEVELS),
+    ])
+
+
+def color_hash(path):
+    """Hashes of an image file and of its brightness-inverted design, as ints."""
+    with Image.open(path) as img:
+        # draft() lets JPEGs decode at reduced size
+        img.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE))
+        img = img.convert('RGBA')
+    # Pillow resizes RGBA premultiplied, so faded areas keep their own color
+    small = np.asarray(img.resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BOX), dtype=np.float64)
+    rgb, alpha = small[..., :3], small[..., 3]
+
+    inside = alpha > 0
+    # Only square images are laid out like the templates
+    if img.width == img.height:
+        inside &= _panel_mask(rgb, alpha)
+    if not inside.any():
+        inside = np.ones_like(inside)
+
+    ycc = np.stack([rgb @ (0.299, 0.587, 0.114),
+                    128 + rgb @ (-0.168736, -0.331264, 0.5),
+                    128 + rgb @ (0.5, -0.418688, -0.081312)], axis=-1)
+    inverted = ycc.copy()
+    inverted[..., 0] = 255 - inverted[..., 0]
+    return _pack(_hash_bits(ycc, inside)), _pack(_hash_bits(inverted, inside))
+
+
+def _words(value):
+    """An int hash as HASH_WORDS uint64 words."""
+    return np.frombuffer(value.to_bytes(HASH_WORDS * 8, 'big'), dtype='>u8').astype(np.uint64)
+
+
+def _popcount(values):
+    """Set bits in each uint64."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).astype(np.int64)
+    return np.unpackbits(values.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def hamming(hashes, query):
+    """Bit distances between hashes given as uint64 words along the last axis (broadcasting)."""
+    xor = np.bitwise_xor(hashes, query)
+    return _popcount(xor.ravel()).reshape(xor.shape).sum(axis=-1)
+
+
+def find_images(paths):
+    """Expand directories into the images they contain, sorted by name."""
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            images.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith(IMAGE_EXTENSIONS)))
+        else:
+            images.append(path)
+    return images
+
+
+class SimilarityIndex:
+    """Persistent path -> color-layout hash index with Hamming queries."""
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.entries = data['entries']
+        self._arrays = None
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': self.entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def add(self, paths):
+        """Hash `paths` into the index; returns how many had to be decoded."""
+        by_digest = {entry['digest']: (entry['hash'], entry['inverted']) for entry in self.entries.values()}
+        decoded = 0
+        for path in paths:
+            key = os.path.relpath(os.path.abspath(path), os.path.abspath(REPO_DIR))
+            st = os.stat(path)
+            stamp = [st.st_mtime_ns, st.st_size]
+            entry = self.entries.get(key)
+            if entry is not None and entry['stamp'] == stamp:
+                continue
+            digest = asset_cache.file_digest(path)
+            if digest not in by_digest:
+                by_digest[digest] = tuple(f'{value:0{HASH_WORDS * 16}x}' for value in color_hash(path))
+                decoded += 1
+            value, inverted = by_digest[digest]
+            self.entries[key] = {'digest': digest, 'stamp': stamp, 'hash': value, 'inverted': inverted}
+        self._arrays = None
+        return decoded
+
+    def prune(self):
+        """Drop entries whose files no longer exist."""
+        for key in [key for key in self.entries if not os.path.exists(os.path.join(REPO_DIR, key))]:
+            del self.entries[key]
+        self._arrays = None
+
+    def _packed(self):
+        if self._arrays is None:
+            keys = sorted(self.entries)
+            hashes = np.zeros((len(keys), HASH_WORDS), dtype=np.uint64)
+            inverted = np.zeros((len(keys), HASH_WORDS), dtype=np.uint64)
+            for i, key in enumerate(keys):
+                hashes[i] = _words(int(self.entries[key]['hash'], 16))
+                inverted[i] = _words(int(self.entries[key]['inverted'], 16))
+            self._arrays = (keys, hashes, inverted)
+        return self._arrays
+
+    def nearest(self, query, k=5, exclude=None, inverted=True):
+        """The `k` closest entries to a (hash, inverted hash) pair, as (distance, path) pairs."""
+        keys, hashes, inverted_hashes = self._packed()
+        value, inverse = (_words(part) for part in query)
+        distances = hamming(hashes, value)
+        if inverted:
+            distances = np.minimum(distances, np.minimum(hamming(hashes, inverse),
+                                                         hamming(inverted_hashes, value)))
+        ranked = []
+        for i in np.argsort(distances, kind='stable'):
+            if keys[i] != exclude:
+                ranked.append((int(distances[i]), keys[i]))
+            if len(ranked) == k:
+                break
+        return ranked
+
+    def similar_to(self, path, k=5, inverted=True):
+        """The `k` entries most similar to an image file (indexed or not)."""
+        key = os.path.relpath(os.path.abspath(path), os.path.abspath(REPO_DIR))
+        entry = self.entries.get(key)
+        if entry is not None:
+            query = (int(entry['hash'], 16), int(entry['inverted'], 16))
+        else:
+            query = color_hash(path)
+        return self.nearest(query, k, exclude=key, inverted=inverted)
+
+    def duplicates(self, threshold=DUPLICATE_THRESHOLD, inverted=True, chunk=256):
+        """Every pair within `threshold` bits, as (distance, path_a, path_b), closest first."""
+        keys, hashes, inverted_hashes = self._packed()
+        pairs = []
+        for start in range(0, len(hashes), chunk):
+            block = hashes[start:start + chunk, np.newaxis]
+            distances = hamming(block, hashes[np.newaxis])
+            if inverted:
+                # Either side may be the inverted one; keep the pair symmetric
+                flipped = np.minimum(hamming(inverted_hashes[start:start + chunk, np.newaxis], hashes[np.newaxis]),
+                                     hamming(block, inverted_hashes[np.newaxis]))
+                distances = np.minimum(distances, flipped)
+            rows, cols = np.nonzero(distances <= threshold)
+            for row, col in zip(rows, cols):
+                i = start + row
+                if i < col:
+                    pairs.append((int(distances[row, col]), keys[i], keys[col]))
+        return sorted(pairs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Find near-duplicate and similar skins.')
+    parser.add_argument('paths', nargs='*', help='skins or folders to index (default: skins, examples)')
+    parser.add_argument('--like', metavar='SKIN', help='list the skins most similar to this one')
+    parser.add_argument('-k', type=int, default=5, help='results for --like')
+    parser.add_argument('--threshold', type=int, default=DUPLICATE_THRESHOLD,
+                        help=f'max differing bits (of {HASH_BITS}) for a near-duplicate')
+    parser.add_argument('--no-inverted', action='store_true',
+                        help='do not treat light/dark-inverted designs as similar')
+    parser.add_argument('--index', default=INDEX_PATH, help='index file')
+    args = parser.parse_args(argv)
+
+    paths = args.paths or [os.path.join(REPO_DIR, 'skins'), os.path.join(REPO_DIR, 'examples')]
+    index = SimilarityIndex(args.index)
+    index.prune()
+    images = find_images(paths)
+    decoded = index.add(images)
+    index.save()
+    print(f'Indexed {len(images)} images ({decoded} hashed, {len(images) - decoded} from the index)')
+
+    if args.like:
+        for distance, path in index.similar_to(args.like, args.k, not args.no_inverted):
+            print(f'{distance:3d}  {path}')
+        return 0
+
+    pairs = index.duplicates(args.threshold, not args.no_inverted)
+    for distance, first, second in pairs:
+        print(f'{distance:3d}  {first}  ~  {second}')
+    print(f'{len(pairs)} near-duplicate pairs within {args.threshold} bits')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Skin Validator and USB Packager
+
+Checks skins against the car's limits (PNG, 512-1024 px, at most 1 MB)
+by reading only the PNG signature, the IHDR chunk and the file size, so
+whole libraries can be scanned without decoding any pixels. The packager
+copies up to 10 valid skins into a USB drive's `Wraps` folder and verifies
+every copy by checksum.
+
+Usage: python skin_check.py [PATH ...]
+       python skin_check.py --package USB_ROOT [PATH ...]
+
+PATHs are skin files or directories of skins (default: skins/).
+"""
+
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import zlib
+
+import png_encoder
+
+SKINS_DIR = os.path.join(os.path.dirname(__file__), '..', 'skins')
+
+MIN_SIZE = 512
+MAX_SIZE = 1024
+MAX_BYTES = png_encoder.MAX_SKIN_BYTES
+MAX_FILES = 10
+WRAPS_DIR_NAME = 'Wraps'
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Signature, IHDR length and type, 13 bytes of IHDR data, CRC
+HEADER_BYTES = 8 + 8 + 13 + 4
+
+COPY_CHUNK = 1 << 20
+
+
+def read_header(path):
+    """Return (width, height, bit_depth, color_type) from a PNG's IHDR chunk.
+
+    Raises ValueError if the file does not start with a valid PNG header.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_BYTES)
+    if len(header) < HEADER_BYTES or not header.startswith(PNG_SIGNATURE):
+        raise ValueError('not a PNG file')
+    length, chunk_type = struct.unpack('>I4s', header[8:16])
+    if chunk_type != b'IHDR' or length != 13:
+        raise ValueError('PNG does not start with an IHDR chunk')
+    (crc,) = struct.unpack('>I', header[29:33])
+    if zlib.crc32(header[12:29]) != crc:
+        raise ValueError('corrupt IHDR chunk (bad CRC)')
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', header[16:26])
+    return width, height, bit_depth, color_type
+
+
+def check_skin(path):
+    """Check one file against the car's skin requirements.
+
+    Returns a dict with the path, size in bytes, dimensions (if readable)
+    and a list of problems; the skin is valid when the list is empty.
+    """
+    result = {'path': path, 'bytes': os.path.getsize(path), 'width': None, 'height': None, 'problems': []}
+    problems = result['problems']
+
+    try:
+        result['width'], result['height'], _, _ = read_header(path)
+    except ValueError as e:
+        problems.append(str(e))
+    else:
+        for axis in ('width', 'height'):
+            if not MIN_SIZE <= result[axis] <= MAX_SIZE:
+                problems.append(f'{axis} {result[axis]} px is outside {MIN_SIZE}-{MAX_SIZE} px')
+
+    if result['bytes'] > MAX_BYTES:
+        problems.append(f'{result["bytes"]:,} bytes is over the {MAX_BYTES:,} byte limit')
+    return result
+
+
+def find_skins(paths):
+    """Expand directories into the (non-hidden) files they contain, sorted by name."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                files.extend(sorted(entry.path for entry in entries
+                                    if entry.is_file() and not entry.name.startswith('.')))
+        else:
+            files.append(path)
+    return files
+
+
+def check_all(paths):
+    """Check every skin under `paths` and return the result dicts."""
+    return [check_skin(path) for path in find_skins(paths)]
+
+
+def _copy_verified(source, destination):
+    """Copy `source` to `destination`, hashing on the way, then re-read and compare."""
+    h = hashlib.sha256()
+    tmp_path = f'{destination}.tmp'
+    with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for chunk in iter(lambda: src.read(COPY_CHUNK), b''):
+            h.update(chunk)
+            dst.write(chunk)
+        dst.flush()
+        os.fsync(dst.fileno())
+    expected = h.hexdigest()
+
+    h = hashlib.sha256()
+    with open(tmp_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            h.update(chunk)
+    if h.hexdigest() != expected:
+        os.remove(tmp_path)
+        raise OSError(f'Checksum mismatch copying {source} to {destination}')
+    os.replace(tmp_path, destination)
+    return expected
+
+
+def package(paths, usb_root, limit=MAX_FILES):
+    """Copy up to `limit` valid skins into `<usb_root>/Wraps`.
+
+    Skins already in the folder count towards the limit; replacing one with
+    a file of the same name does not take a new slot. Returns a dict with
+    the copied paths and checksums, plus the skins that were skipped as
+    invalid or over the limit.
+    """
+    wraps_dir = os.path.join(usb_root, WRAPS_DIR_NAME)
+    os.makedirs(wraps_dir, exist_ok=True)
+
+    results = check_all(paths)
+    valid = [r['path'] for r in results if not r['problems']]
+    invalid = [r for r in results if r['problems']]
+
+    # One skin per file name; the first occurrence wins
+    chosen = {}
+    for path in valid:
+        chosen.setdefault(os.path.basename(path), path)
+    existing = {name for name in os.listdir(wraps_dir) if name.lower().endswith('.png')}
+    added = [name for name in chosen if name not in existing]
+    slots = max(0, limit - len(existing))
+    over_limit = set(added[slots:])
+    names = [name for name in chosen if name not in over_limit]
+
+    copied = []
+    for name in names:
+        destination = os.path.join(wraps_dir, name)
+        digest = _copy_verified(chosen[name], destination)
+        copied.append({'source': chosen[name], 'path': destination, 'sha256': digest})
+        print(f'Copied: {destination}')
+
+    return {
+        'wraps_dir': wraps_dir,
+        'copied': copied,
+        'invalid': invalid,
+        'over_limit': [chosen[name] for name in added[slots:]],
+    }
+
+
+def _describe(result):
+    size = f'{result["width"]}x{result["height"]}' if result['width'] is not None else '?'
+    return f'{result["path"]} ({size}, {result["bytes"]:,} bytes)'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check skins against the car\'s limits and package them for USB.')
+    parser.add_argument('paths', nargs='*', default=[SKINS_DIR], help='skin files or directories (default: skins/)')
+    parser.add_argument('--package', metavar='USB_ROOT', help='copy up to 10 valid skins into USB_ROOT/Wraps')
+    parser.add_argument('--quiet', action='store_true', help='only report problems')
+    args = parser.parse_args(argv)
+
+    if args.package:
+        summary = package(args.paths, args.package)
+        for result in summary['invalid']:
+            print(f'Skipped (invalid): {result["path"]}: {"; ".join(result["problems"])}')
+        for path in summary['over_limit']:
+            print(f'Skipped (over the {MAX_FILES} file limit): {path}')
+        print(f'{len(summary["copied"])} skins copied to {summary["wraps_dir"]}')
+        return 0 if summary['copied'] else 1
+
+    results = check_all(args.paths)
+    failed = [r for r in results if r['problems']]
+    for result in results:
+        if result['problems']:
+            print(f'FAIL {_describe(result)}: {"; ".join(result["problems"])}')
+        elif not args.quiet:
+            print(f'ok   {_describe(result)}')
+    print(f'{len(results) - len(failed)} of {len(results)} skins valid')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
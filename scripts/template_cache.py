@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Shared Template Cache
+
+Decodes each vehicle template once per process and keeps the RGBA image
+together with the masks the generators build from it.
+"""
+
+from PIL import Image
+import glob
+import os
+import threading
+
+import profiling
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), '..', 'templates')
+DEFAULT_TEMPLATE = os.path.join(TEMPLATES_DIR, 'modely-2025-premium', 'template.png')
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class Template:
+    """A decoded template plus its precomputed masks.
+
+    The images are shared between every caller, so treat them as read-only.
+    """
+
+    def __init__(self, path, stamp):
+        self.path = path
+        self.stamp = stamp
+        with profiling.stage('template_load', path=path):
+            self.image = Image.open(path).convert('RGBA')
+            self.size = self.image.size
+            # Luminance mask - white panel areas are 255, outlines are 0
+            self.mask = self.image.convert('L')
+            # First band, used when compositing over the template itself
+            self.red_mask = self.image.split()[0]
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    @property
+    def inverted_mask(self):
+        """Mask selecting the outlines instead of the panels."""
+        return self._derive('inverted', lambda: self.mask.point(lambda v: 255 - v))
+
+    @property
+    def inverted_red_mask(self):
+        """Inverse of red_mask, for pasting the template over a design."""
+        return self._derive('inverted_red', lambda: self.red_mask.point(lambda v: 255 - v))
+
+    def inverted_mask_bands(self, rows):
+        """inverted_mask cut into horizontal bands of `rows` rows, as (box, band) pairs."""
+        # Fetched first: _derive's lock is not reentrant
+        inverted = self.inverted_mask
+        width, height = self.size
+        boxes = [(0, top, width, min(top + rows, height)) for top in range(0, height, rows)]
+        return self._derive(('inverted_bands', rows), lambda: [(box, inverted.crop(box)) for box in boxes])
+
+    def threshold_mask(self, level=128):
+        """Hard-edged mask: 255 where the luminance is at least `level`."""
+        return self._derive(('threshold', level),
+                            lambda: self.mask.point(lambda v: 255 if v >= level else 0))
+
+    def _derive(self, key, build):
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = build()
+            return self._derived[key]
+
+
+def available_templates():
+    """Paths of every template shipped in templates/, sorted by trim name."""
+    return sorted(glob.glob(os.path.join(TEMPLATES_DIR, '*', 'template.png')))
+
+
+def trim_name(path):
+    """Trim folder name for a template path, e.g. 'modely-2025-base'."""
+    return os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+
+def _stamp(path):
+    """Cheap change detector for a template file."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_template(path=DEFAULT_TEMPLATE):
+    """Return the cached Template for `path`, re-decoding it if the file changed."""
+    key = os.path.abspath(path)
+    stamp = _stamp(key)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry.stamp != stamp:
+            entry = Template(key, stamp)
+            _cache[key] = entry
+        return entry
+
+
+def load_template(path=DEFAULT_TEMPLATE):
+    """Return the shared RGBA template image."""
+    return get_template(path).image
+
+
+def load_mask(path=DEFAULT_TEMPLATE):
+    """Return the shared L-mode panel mask for the template."""
+    return get_template(path).mask
+
+
+def clear_cache():
+    """Drop every cached template."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Procedural Textures
+
+Seeded, reproducible organic textures - gradient noise, Voronoi cells, camo
+and marble - computed with array operations a band of rows at a time, so
+the float temporaries stay small. The same seed always gives the same
+texture, so a design can be re-rendered exactly.
+
+Available textures: noise, cells, camo, marble.
+"""
+
+from PIL import Image
+import math
+
+import numpy as np
+
+import gradients
+
+CAMO_COLORS = ((84, 94, 58, 255), (126, 112, 74, 255), (52, 48, 36, 255), (24, 24, 20, 255))
+MARBLE_COLORS = ((236, 233, 226, 255), (70, 70, 80, 255))
+NOISE_COLORS = ((15, 15, 20, 255), (120, 130, 150, 255))
+CELL_COLORS = ((30, 30, 30, 255), (200, 30, 40, 255), (230, 230, 230, 255), (60, 60, 70, 255))
+
+
+def _rng(*seed):
+    return np.random.default_rng([int(part) for part in seed])
+
+
+def _fade(t):
+    """Perlin's quintic smoothstep."""
+    return t * t * t * (t * (t * 6 - 15) + 10)
+
+
+def perlin(size, scale=64.0, seed=0):
+    """Gradient noise with features about `scale` px across, roughly in [-1, 1]."""
+    width, height = size
+    rows = int(height / scale) + 2
+    cols = int(width / scale) + 2
+    angles = _rng(seed).uniform(0, 2 * math.pi, (rows, cols))
+    grad_x = np.cos(angles).astype(np.float32)
+    grad_y = np.sin(angles).astype(np.float32)
+
+    # Lattice cell and position within it, per row and per column
+    ys = ((np.arange(height) + 0.5) / scale).astype(np.float32)
+    xs = ((np.arange(width) + 0.5) / scale).astype(np.float32)
+    y0 = ys.astype(np.int64)
+    x0 = xs.astype(np.int64)
+    fy = (ys - y0)[:, np.newaxis]
+    fx = (xs - x0)[np.newaxis, :]
+
+    u = _fade(fx)
+    v = _fade(fy)
+    noise = np.empty((height, width))
+    # Rows are independent; interpolate a band at a time so the corner
+    # gathers and blends stay band-sized
+    for top in range(0, height, gradients.BAND_ROWS):
+        rows = slice(top, top + gradients.BAND_ROWS)
+        band_y0, band_fy = y0[rows], fy[rows]
+
+        def corner(dy, dx):
+            # Gather lattice rows first (cheap), then columns: one band-size gather per gradient
+            gx = grad_x[band_y0 + dy][:, x0 + dx]
+            gy = grad_y[band_y0 + dy][:, x0 + dx]
+            return gx * (fx - dx) + gy * (band_fy - dy)
+
+        n00 = corner(0, 0)
+        n10 = corner(1, 0)
+        top_row = n00 + u * (corner(0, 1) - n00)
+        bottom_row = n10 + u * (corner(1, 1) - n10)
+        noise[rows] = (top_row + v[rows] * (bottom_row - top_row)) * np.float32(math.sqrt(2))
+    return noise
+
+
+def fbm(size, scale=64.0, octaves=4, persistence=0.5, seed=0):
+    """Fractal noise: `octaves` layers of Perlin noise, each twice as fine and `persistence` as strong."""
+    total = np.zeros((size[1], size[0]), dtype=np.float32)
+    amplitude = 1.0
+    norm = 0.0
+    for octave in range(octaves):
+        total += amplitude * perlin(size, scale / 2 ** octave, seed=seed * 997 + octave)
+        norm += amplitude
+        amplitude *= persistence
+    return total / norm
+
+
+def worley(size, cell=64.0, seed=0):
+    """Voronoi distances on a jittered grid of one point per `cell` px.
+
+    Returns (f1, f2, ids): the distance to the nearest and second nearest
+    point, in cells, and the index of the nearest point's cell.
+    """
+    width, height = size
+    grid_rows = int(height / cell) + 1
+    cols = int(width / cell) + 1
+    # Keep points off the cell edges so neighbouring points never nearly coincide
+    points = 0.1 + 0.8 * _rng(seed, 1).random((grid_rows, cols, 2))
+
+    ys = ((np.arange(height) + 0.5) / cell)[:, np.newaxis]
+    xs = ((np.arange(width) + 0.5) / cell)[np.newaxis, :]
+    cy = ys.astype(np.int64)
+    cx = xs.astype(np.int64)
+
+    f1 = np.empty((height, width))
+    f2 = np.empty((height, width))
+    ids = np.empty((height, width), dtype=np.int64)
+    # Rows are independent; search a band at a time so the full-size
+    # float temporaries of the 3x3 search stay band-sized
+    for top in range(0, height, gradients.BAND_ROWS):
+        rows = slice(top, top + gradients.BAND_ROWS)
+        band_ys, band_cy = ys[rows], cy[rows]
+        band_f1 = np.full((len(band_ys), width), np.inf)
+        band_f2 = np.full((len(band_ys), width), np.inf)
+        band_ids = np.zeros((len(band_ys), width), dtype=np.int64)
+        # The nearest two points are always in the surrounding 3x3 cells
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                ny = (band_cy + dy) % grid_rows
+                nx = (cx + dx) % cols
+                px = cx + dx + points[ny, nx, 0]
+                py = band_cy + dy + points[ny, nx, 1]
+                distance = np.hypot(px - xs, py - band_ys)
+                closer = distance < band_f1
+                band_f2 = np.where(closer, band_f1, np.minimum(band_f2, distance))
+                band_f1 = np.where(closer, distance, band_f1)
+                band_ids = np.where(closer, ny * cols + nx, band_ids)
+        f1[rows], f2[rows], ids[rows] = band_f1, band_f2, band_ids
+    return f1, f2, ids
+
+
+def _rgba(colors):
+    return np.asarray([tuple(color) + (255,) * (4 - len(color)) for color in colors], dtype=np.uint8)
+
+
+def noise(size, colors=None, scale=1.0, seed=0):
+    """Cloudy fractal noise mapped through a color ramp."""
+    field = fbm(size, 96 * scale, octaves=5, seed=seed)
+    return gradients.gradient_map(np.clip(field * 0.9 + 0.5, 0, 1), list(colors or NOISE_COLORS))
+
+
+def cells(size, colors=None, scale=1.0, seed=0):
+    """Voronoi cells, each filled with one of `colors` (the first is the cell border)."""
+    palette = _rgba(colors or CELL_COLORS)
+    cell = 80 * scale
+    f1, f2, ids = worley(size, cell, seed)
+    fills = _rng(seed, 2).integers(1, len(palette), ids.max() + 1)
+    pixels = np.empty((size[1], size[0], 4), dtype=np.uint8)
+    # Pixels about equally close to two points lie on a border. Fill and
+    # blend a band of rows at a time so the temporaries stay small
+    edge = palette[0].astype(np.float64)
+    for top in range(0, size[1], gradients.BAND_ROWS):
+        rows = slice(top, top + gradients.BAND_ROWS)
+        fill = palette[fills[ids[rows]]]
+        border = np.clip((2.5 - (f2[rows] - f1[rows]) * cell) / 1.5, 0, 1)
+        band = fill + (edge - fill) * border[:, :, np.newaxis]
+        pixels[rows] = (band + 0.5).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+
+def camo(size, colors=None, scale=1.0, seed=0):
+    """Woodland camo: blotches of each color over the first, from separate noise fields."""
+    palette = _rgba(colors or CAMO_COLORS)
+    width, height = size
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[:] = palette[0]
+    # Blotches are low-frequency: build the fields at half size and upsample
+    # smoothly before thresholding, which keeps the edges clean
+    half = ((width + 1) // 2, (height + 1) // 2)
+    for layer, color in enumerate(palette[1:]):
+        field = fbm(half, 75 * scale, octaves=3, persistence=0.45, seed=seed * 31 + layer)
+        field = np.asarray(Image.fromarray(field, 'F').resize(size, Image.Resampling.BILINEAR))
+        # Later layers cover less, so every color stays visible
+        coverage = 0.55 / (1 + 0.4 * layer)
+        threshold = np.quantile(field[::4, ::4], 1 - coverage)
+        pixels[field > threshold] = color
+    return Image.fromarray(pixels)
+
+
+def marble(size, colors=None, scale=1.0, seed=0, turbulence=6.0):
+    """Marble: thin diagonal veins of the second color, warped by fractal noise."""
+    base, vein = colors or MARBLE_COLORS
+    width, height = size
+    xs = np.arange(width)[np.newaxis, :]
+    ys = np.arange(height)[:, np.newaxis]
+    warp = fbm(size, 200 * scale, octaves=5, seed=seed)
+    veins = np.empty((height, width))
+    for top in range(0, height, gradients.BAND_ROWS):
+        rows = slice(top, top + gradients.BAND_ROWS)
+        phase = (xs + ys[rows]) / (120 * scale) * math.pi + turbulence * warp[rows]
+        veins[rows] = (1 - np.abs(np.sin(phase))) ** 10
+    return gradients.gradient_map(veins, [base, vein])
+
+
+TEXTURES = {
+    'camo': camo,
+    'cells': cells,
+    'marble': marble,
+    'noise': noise,
+}
+
+
+def texture(size, name, seed=0, scale=1.0, colors=None):
+    """Render a texture by name at `size`.
+
+    `scale` stretches the features (2 = twice as large); `colors` overrides
+    the texture's default colors. `seed` must be a non-negative integer.
+    """
+    if name not in TEXTURES:
+        raise ValueError(f'Unknown texture {name!r}; choose from {", ".join(sorted(TEXTURES))}')
+    if not scale > 0:
+        raise ValueError(f'Texture scale must be positive, got {scale!r}')
+    if int(seed) != seed or seed < 0:
+        raise ValueError(f'Texture seed must be a non-negative integer, got {seed!r}')
+    return TEXTURES[name](size, colors, scale, seed)
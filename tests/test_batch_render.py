@@ -0,0 +1,19 @@
+import json
+
+import pytest
+
+import batch_render
+
+
+@pytest.mark.parametrize('skins', [
+    [{'generator': 'create_nothing', 'params': {}}],
+    [{'generator': 'create_matte_black', 'params': {'colour': 1}}],
+    [{'generator': 'create_matte_black', 'params': {'output_name': 'a'}},
+     {'generator': 'create_carbon_fiber', 'params': {'output_name': 'a'}}],
+])
+def test_bad_spec_exits_with_message(tmp_path, capsys, skins):
+    spec = tmp_path / 'spec.json'
+    spec.write_text(json.dumps({'output_dir': 'out', 'skins': skins}))
+    assert batch_render.main([str(spec)]) == 2
+    assert capsys.readouterr().err.startswith('Error: ')
+    assert not (tmp_path / 'out').exists()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+import asset_cache
+import build_manifest
+import generate_skin
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    template_path = tmp_path / 'template.png'
+    shutil.copy(generate_skin.TEMPLATE_PATH, template_path)
+    monkeypatch.setattr(generate_skin, 'OUTPUT_DIR', str(tmp_path / 'skins'))
+    monkeypatch.setattr(generate_skin, 'TEMPLATE_PATH', str(template_path))
+    monkeypatch.setattr(build_manifest, 'MANIFEST_PATH', str(tmp_path / 'manifest.json'))
+    os.makedirs(tmp_path / 'skins')
+    return tmp_path
+
+
+def _built(color=(10, 200, 30, 255)):
+    """Build one solid skin and return (its job, a manifest reloaded from disk)."""
+    job = build_manifest.job(generate_skin.create_solid_color, color, 'solid')
+    assert build_manifest.build([job]) == 1
+    return job, build_manifest.Manifest()
+
+
+def _is_fresh(manifest, job):
+    return manifest.is_fresh(*build_manifest.describe(*job))
+
+
+def test_fresh_after_record(workspace):
+    job, manifest = _built()
+    assert _is_fresh(manifest, job)
+    assert build_manifest.build([job]) == 0
+
+
+def test_stale_after_param_change(workspace):
+    job, manifest = _built()
+    other = build_manifest.job(generate_skin.create_solid_color, (10, 200, 31, 255), 'solid')
+    assert not _is_fresh(manifest, other)
+    assert build_manifest.build([other]) == 1
+
+
+def test_stale_after_template_change(workspace):
+    job, manifest = _built()
+    with open(workspace / 'template.png', 'ab') as f:
+        f.write(b'\0')
+    assert not _is_fresh(manifest, job)
+
+
+def test_stale_after_source_change(workspace, monkeypatch):
+    job, manifest = _built()
+    # A helper module the generator imports changes, not the generator's own file
+    helper = os.path.abspath(sys.modules['gradients'].__file__)
+    assert helper in build_manifest._local_modules(generate_skin)
+    file_digest = asset_cache.file_digest
+    monkeypatch.setattr(asset_cache, 'file_digest',
+                        lambda path: 'edited' if os.path.abspath(path) == helper else file_digest(path))
+    monkeypatch.setattr(build_manifest, '_source_hashes', {})
+    assert not _is_fresh(manifest, job)
+
+
+def test_stale_after_output_touched(workspace):
+    job, manifest = _built()
+    output_path = workspace / 'skins' / 'solid.png'
+    st = output_path.stat()
+    os.utime(output_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert not _is_fresh(manifest, job)
+    output_path.unlink()
+    assert not _is_fresh(manifest, job)
+
+
+def test_dry_run_writes_nothing(workspace, capsys):
+    job = build_manifest.job(generate_skin.create_solid_color, (10, 200, 30, 255), 'solid')
+    assert build_manifest.build([job], dry_run=True) == 1
+    assert 'Would rebuild:' in capsys.readouterr().out
+    assert os.listdir(workspace / 'skins') == []
+    assert not (workspace / 'manifest.json').exists()
+
+
+def test_force_rebuilds_fresh_skins(workspace):
+    job, _ = _built()
+    assert build_manifest.build([job], force=True) == 1
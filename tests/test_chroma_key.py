@@ -0,0 +1,88 @@
+import os
+
+from PIL import Image
+import numpy as np
+import pytest
+
+import chroma_key
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), '..', 'assets')
+
+
+def _remove_background(img, keys):
+    """The per-pixel loop chroma_key replaced, checking every (color, threshold) key."""
+    img = img.convert('RGBA')
+    new_data = []
+    for item in img.getdata():
+        r, g, b, a = item
+        if any(abs(r - bg_color[0]) < threshold and
+               abs(g - bg_color[1]) < threshold and
+               abs(b - bg_color[2]) < threshold for bg_color, threshold in keys):
+            new_data.append((255, 255, 255, 0))
+        else:
+            new_data.append(item)
+    img.putdata(new_data)
+    return img
+
+
+def _random_image(seed, size=(48, 40)):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size[::-1] + (4,), dtype=np.uint8)
+    # Plenty of pixels near the key colors
+    near = rng.random(size[::-1]) < 0.4
+    pixels[near, :3] = np.clip(np.array([255, 0, 0]) + rng.integers(-80, 80, (near.sum(), 3)), 0, 255)
+    return Image.fromarray(pixels)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('keys', [
+    [((255, 0, 0), 60)],
+    [((255, 255, 255), 30)],
+    [((0, 0, 0), 1)],
+    [((255, 0, 0), 60), ((0, 0, 255), 90)],
+])
+def test_key_out_matches_per_pixel_loop(seed, keys):
+    img = _random_image(seed)
+    expected = _remove_background(img, keys)
+    result = chroma_key.key_out(img, keys)
+    np.testing.assert_array_equal(np.asarray(result), np.asarray(expected))
+
+
+@pytest.mark.parametrize('name', sorted(os.listdir(ASSETS_DIR)))
+def test_key_out_matches_on_assets(name):
+    with Image.open(os.path.join(ASSETS_DIR, name)) as img:
+        img = img.convert('RGBA')
+    img.thumbnail((160, 160))
+    keys = [((255, 255, 255), 40)]
+    expected = _remove_background(img, keys)
+    result = chroma_key.key_out(img, keys)
+    np.testing.assert_array_equal(np.asarray(result), np.asarray(expected))
+
+
+@pytest.mark.parametrize('alpha', [255, 120])
+def test_softness_ramps_alpha_past_the_threshold(alpha):
+    threshold, softness = 30, 8
+    # One pixel per distance from the key, 0 .. beyond the end of the ramp
+    distances = np.arange(threshold + softness + 4)
+    pixels = np.zeros((1, len(distances), 4), dtype=np.uint8)
+    pixels[0, :, 0] = 255
+    pixels[0, :, 1] = distances
+    pixels[0, :, 3] = alpha
+    result = np.asarray(chroma_key.key_out(Image.fromarray(pixels), [((255, 0, 0), threshold)], softness))[0]
+
+    inside = distances < threshold
+    assert (result[inside] == chroma_key.CLEAR_PIXEL).all()
+    # Outside the key the color stays and alpha rises linearly from 0 at the threshold
+    np.testing.assert_array_equal(result[~inside, :3], pixels[0, ~inside, :3])
+    ramp = np.clip((distances[~inside] - threshold) / softness, 0, 1)
+    np.testing.assert_array_equal(result[~inside, 3], (alpha * ramp + 0.5).astype(np.uint8))
+    assert result[threshold, 3] == 0
+    assert (result[threshold + softness:, 3] == alpha).all()
+
+
+def test_zero_softness_is_a_hard_key():
+    img = _random_image(7)
+    hard = chroma_key.key_out(img, [((255, 0, 0), 60)])
+    np.testing.assert_array_equal(np.asarray(chroma_key.key_out(img, [((255, 0, 0), 60)], 0)),
+                                  np.asarray(hard))
+    np.testing.assert_array_equal(np.asarray(hard), np.asarray(_remove_background(img, [((255, 0, 0), 60)])))
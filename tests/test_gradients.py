@@ -0,0 +1,41 @@
+from PIL import Image, ImageDraw
+import numpy as np
+import pytest
+
+import gradients
+
+
+def _line_gradient(size, color1, color2, vertical):
+    """The line-by-line gradient create_gradient used to draw."""
+    width, height = size
+    gradient = Image.new('RGBA', size)
+    draw = ImageDraw.Draw(gradient)
+    r1, g1, b1 = color1
+    r2, g2, b2 = color2
+    for i in range(height if vertical else width):
+        ratio = i / (height if vertical else width)
+        r = int(r1 + (r2 - r1) * ratio)
+        g = int(g1 + (g2 - g1) * ratio)
+        b = int(b1 + (b2 - b1) * ratio)
+        line = [(0, i), (width, i)] if vertical else [(i, 0), (i, height)]
+        draw.line(line, fill=(r, g, b, 255))
+    return gradient
+
+
+@pytest.mark.parametrize('size', [(64, 48), (300, 7), (1, 130)])
+@pytest.mark.parametrize('colors', [((0, 100, 200), (100, 0, 150)), ((239, 26, 45), (30, 5, 8)),
+                                    ((255, 255, 255), (0, 0, 0))])
+@pytest.mark.parametrize('vertical', [True, False])
+def test_linear_gradient_matches_line_drawing(size, colors, vertical):
+    expected = _line_gradient(size, *colors, vertical)
+    result = gradients.linear_gradient(size, list(colors), 90 if vertical else 0)
+    np.testing.assert_array_equal(np.asarray(result), np.asarray(expected))
+
+
+def test_linear_gradient_into_existing_image():
+    size = (80, 200)
+    out = Image.new('RGBA', size, (1, 2, 3, 4))
+    result = gradients.linear_gradient(size, [(10, 20, 30), (200, 100, 0)], 90, out=out)
+    assert result is out
+    expected = _line_gradient(size, (10, 20, 30), (200, 100, 0), vertical=True)
+    np.testing.assert_array_equal(np.asarray(out), np.asarray(expected))
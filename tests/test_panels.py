@@ -0,0 +1,72 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+import panels
+import template_cache
+
+
+def _bfs_label(binary):
+    """Reference 4-connected labelling, numbered in order of first pixel."""
+    labels = np.zeros(binary.shape, dtype=np.int32)
+    height, width = binary.shape
+    count = 0
+    for y in range(height):
+        for x in range(width):
+            if not binary[y, x] or labels[y, x]:
+                continue
+            count += 1
+            labels[y, x] = count
+            queue = deque([(y, x)])
+            while queue:
+                cy, cx = queue.popleft()
+                for ny, nx in ((cy - 1, cx), (cy + 1, cx), (cy, cx - 1), (cy, cx + 1)):
+                    if 0 <= ny < height and 0 <= nx < width and binary[ny, nx] and not labels[ny, nx]:
+                        labels[ny, nx] = count
+                        queue.append((ny, nx))
+    return labels, count
+
+
+@pytest.mark.parametrize('seed', range(6))
+@pytest.mark.parametrize('density', [0.2, 0.45, 0.6, 0.8])
+def test_label_matches_bfs(seed, density):
+    rng = np.random.default_rng(seed)
+    shape = tuple(rng.integers(1, 60, 2))
+    binary = rng.random(shape) < density
+    labels, count = panels.label(binary)
+    expected, expected_count = _bfs_label(binary)
+    assert count == expected_count
+    np.testing.assert_array_equal(labels, expected)
+
+
+def test_label_spirals_and_u_shapes():
+    # Shapes whose runs only join several rows further down
+    binary = np.zeros((9, 9), dtype=bool)
+    binary[0, :] = binary[:, 0] = binary[8, :] = binary[2:9, 8] = True
+    binary[2, 2:7] = binary[2:7, 2] = binary[6, 2:7] = binary[4:7, 6] = True
+    binary[4, 4] = True
+    labels, count = panels.label(binary)
+    expected, expected_count = _bfs_label(binary)
+    assert count == expected_count == 3
+    np.testing.assert_array_equal(labels, expected)
+
+
+@pytest.mark.parametrize('fill', [False, True])
+def test_label_empty_and_full(fill):
+    binary = np.full((7, 5), fill)
+    labels, count = panels.label(binary)
+    assert count == int(fill)
+    np.testing.assert_array_equal(labels, binary.astype(np.int32))
+
+
+def test_cache_key_covers_build_parameters(monkeypatch):
+    template_path = template_cache.DEFAULT_TEMPLATE
+    panels._build_hash.cache_clear()
+    before = panels._cache_path(template_path)
+    monkeypatch.setattr(panels, 'EDGE_GROWTH', panels.EDGE_GROWTH + 1)
+    panels._build_hash.cache_clear()
+    try:
+        assert panels._cache_path(template_path) != before
+    finally:
+        panels._build_hash.cache_clear()
@@ -0,0 +1,9 @@
+import pytest
+
+import patterns
+
+
+@pytest.mark.parametrize('scale', [0, -2, 0.5])
+def test_scale_below_one_raises(scale):
+    with pytest.raises(ValueError):
+        patterns.fill((32, 32), 'hex', scale)
@@ -0,0 +1,72 @@
+import os
+
+from PIL import Image
+import numpy as np
+import pytest
+
+import png_encoder
+
+
+def _noise(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (size, size, 4), dtype=np.uint8), 'RGBA')
+
+
+def test_small_image_uses_default_encode():
+    data, stats = png_encoder.encode_png(Image.new('RGBA', (64, 64), (10, 200, 30, 255)))
+    assert stats['options'] == {}
+    assert stats['attempts'] == 1
+    assert len(data) == stats['bytes']
+
+
+def test_over_budget_falls_back_to_palette():
+    image = _noise(300)
+    default_size = len(png_encoder._encode(image, {}))
+    budget = default_size // 3
+    data, stats = png_encoder.encode_png(image, budget)
+    assert len(data) <= budget
+    assert 'palette' in stats['options']
+
+
+def test_impossible_budget_raises():
+    with pytest.raises(ValueError):
+        png_encoder.encode_png(_noise(600), 1000)
+
+
+def test_impossible_budget_writes_nothing(tmp_path):
+    with pytest.raises(ValueError):
+        png_encoder.save_png(_noise(600), str(tmp_path / 'skin.png'), 1000)
+    assert os.listdir(tmp_path) == []
+
+
+def test_save_png_records_last_stats(tmp_path):
+    stats = png_encoder.save_png(_noise(200), str(tmp_path / 'skin.png'))
+    assert png_encoder.last_stats() is stats
+    assert (tmp_path / 'skin.png').stat().st_size == stats['bytes']
+
+
+def test_stream_impossible_budget_leaves_no_files(tmp_path):
+    with pytest.raises(ValueError):
+        png_encoder.save_png(_noise(600), str(tmp_path / 'skin.png'), 1000, stream=True)
+    assert os.listdir(tmp_path) == []
+
+
+def test_stream_over_budget_falls_back(tmp_path):
+    output_path = tmp_path / 'skin.png'
+    output_path.write_bytes(b'previous')
+    image = _noise(300)
+    budget = len(png_encoder._encode(image, {})) // 3
+    stats = png_encoder.save_png(image, str(output_path), budget, stream=True)
+    # The streamed default encode was over budget, so the palette encode replaced it
+    assert 'palette' in stats['options']
+    assert output_path.stat().st_size == stats['bytes'] <= budget
+    assert os.listdir(tmp_path) == ['skin.png']
+
+
+def test_stream_matches_buffered(tmp_path):
+    image = _noise(200)
+    streamed = png_encoder.save_png(image, str(tmp_path / 'streamed.png'), stream=True)
+    assert png_encoder.last_stats() is streamed
+    png_encoder.save_png(image, str(tmp_path / 'buffered.png'))
+    assert (tmp_path / 'streamed.png').read_bytes() == (tmp_path / 'buffered.png').read_bytes()
+    assert sorted(os.listdir(tmp_path)) == ['buffered.png', 'streamed.png']
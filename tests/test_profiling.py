@@ -0,0 +1,38 @@
+from PIL import Image
+import pytest
+
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def profiling_off():
+    yield
+    profiling.disable()
+    profiling.drain()
+
+
+def _traced_stage():
+    with profiling.stage('draw'):
+        Image.new('RGBA', (100, 100)).copy()
+    (event,) = profiling.drain()
+    return event
+
+
+def test_allocation_tracing_counts_image_buffers():
+    profiling.enable(trace_allocations=True)
+    event = _traced_stage()
+    assert event['image_bytes'] >= 2 * 100 * 100 * 4
+    assert 'alloc_peak_bytes' in event
+
+
+def test_missing_pillow_hook_falls_back_to_tracemalloc(monkeypatch):
+    monkeypatch.delattr(Image.Image, '_new')
+    profiling.enable(trace_allocations=True)
+    with profiling.stage('draw'):
+        buffer = bytearray(2**20)
+    del buffer
+    (event,) = profiling.drain()
+    assert 'image_bytes' not in event
+    assert event['alloc_peak_bytes'] >= 2**20
+    profiling.disable()
+    assert not hasattr(Image.Image, '_new')
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+import render_service
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = render_service.RenderService(workers=1)
+    try:
+        yield service
+    finally:
+        service.close()
+
+
+def test_identical_requests_share_one_render(service):
+    async def run():
+        params = {'color': [10, 200, 30]}
+        first = await asyncio.gather(*[service.render('create_solid_color', params) for _ in range(3)])
+        again = await service.render('create_solid_color', params)
+        return first, again
+
+    before = dict(service.stats)
+    first, again = asyncio.run(run())
+    assert sorted(served for _, served in first) == ['coalesced', 'coalesced', 'miss']
+    assert len({data for data, _ in first}) == 1
+    assert first[0][0].startswith(b'\x89PNG')
+    assert again == (first[0][0], 'hit')
+    assert service.stats['renders'] - before['renders'] == 1
+    assert service.stats['coalesced'] - before['coalesced'] == 2
+    assert service.stats['cache_hits'] - before['cache_hits'] == 1
+
+
+def test_bad_parameters_fail_every_coalesced_request(service):
+    async def run():
+        requests = [service.render('create_texture', {'name': 'nope'}) for _ in range(3)]
+        return await asyncio.gather(*requests, return_exceptions=True)
+
+    before = dict(service.stats)
+    results = asyncio.run(run())
+    assert all(isinstance(e, render_service.HttpError) and e.status == 400 for e in results)
+    assert service.stats['renders'] - before['renders'] == 1
+    assert service.stats['coalesced'] - before['coalesced'] == 2
+    assert service.inflight == {}
+
+
+def test_unknown_generator_and_trim(service):
+    with pytest.raises(render_service.HttpError) as e:
+        asyncio.run(service.render('create_nothing', {}))
+    assert e.value.status == 404
+    with pytest.raises(render_service.HttpError) as e:
+        asyncio.run(service.render('create_solid_color', {'color': [0, 0, 0], 'trim': 'sport'}))
+    assert e.value.status == 400
+
+
+def test_cache_evicts_least_recently_used():
+    cache = render_service.PngCache(max_bytes=10)
+    cache.put('a', b'aaaa')
+    cache.put('b', b'bbbb')
+    cache.get('a')
+    cache.put('c', b'cccc')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'aaaa'
+    assert cache.bytes == 8
+    cache.put('big', b'x' * 11)
+    assert cache.get('big') is None
+
+
+@pytest.mark.parametrize('content_length', ['abc', '-5'])
+def test_bad_content_length_is_a_400(service, content_length):
+    async def run():
+        server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f'POST /render/create_solid_color HTTP/1.1\r\nContent-Length: {content_length}\r\n'
+                         f'Connection: close\r\n\r\n'.encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    response = asyncio.run(run())
+    assert response.startswith(b'HTTP/1.1 400 Bad Request\r\n')
+    assert b'Content-Length' in response.split(b'\r\n\r\n', 1)[1]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import ferrari_f1_sponsors
+import render
+import scene
+
+
+def _assert_same(a, b):
+    np.testing.assert_array_equal(np.asarray(a), np.asarray(b))
+
+
+@pytest.fixture
+def sponsored_scene():
+    return ferrari_f1_sponsors.sponsored_v2_scene()
+
+
+def test_initial_scene_matches_full_render(sponsored_scene):
+    _assert_same(sponsored_scene.final,
+                 render.apply_template(sponsored_scene.flatten(), sponsored_scene.template_path))
+
+
+def test_updates_match_a_fresh_scene(sponsored_scene):
+    width, height = sponsored_scene.size
+    # Moves that overlap the old position, jump far away, and leave the canvas
+    for x, y in [(60, 560), (70, 565), (500, 100), (width - 20, height - 20), (-40, 560)]:
+        box = sponsored_scene.update('shell_left', position=(x, y))
+        assert box is None or box[2] > box[0]
+    sponsored_scene.update('center_stripe', shapes=[('rectangle', [width * 0.4, 0, width * 0.45, height],
+                                                     (20, 20, 20, 255))])
+    sponsored_scene.update('base', color=(0, 40, 120, 255))
+    sponsored_scene.update('vodafone', position=(300, 300))
+
+    fresh = scene.Scene(sponsored_scene.layers, sponsored_scene.template_path)
+    _assert_same(sponsored_scene.canvas, fresh.canvas)
+    _assert_same(sponsored_scene.final, fresh.final)
+    _assert_same(sponsored_scene.final,
+                 render.apply_template(sponsored_scene.flatten(), sponsored_scene.template_path))
+
+
+def test_update_only_touches_the_dirty_box(sponsored_scene):
+    before = np.asarray(sponsored_scene.final).copy()
+    x0, y0, x1, y1 = sponsored_scene.update('shell_right', position=(820, 600))
+    after = np.asarray(sponsored_scene.final).copy()
+    after[y0:y1, x0:x1] = before[y0:y1, x0:x1]
+    np.testing.assert_array_equal(after, before)
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import similarity
+
+LIBRARY = [os.path.join(similarity.REPO_DIR, folder) for folder in ('skins', 'examples')]
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    index = similarity.SimilarityIndex(str(tmp_path_factory.mktemp('index') / 'index.json'))
+    index.add(similarity.find_images(LIBRARY))
+    return index
+
+
+def _distance(index, first, second, inverted=True):
+    pairs = index.duplicates(similarity.HASH_BITS, inverted)
+    for distance, a, b in pairs:
+        if {a, b} == {first, second}:
+            return distance
+    raise AssertionError(f'{first} / {second} not indexed')
+
+
+@pytest.mark.parametrize('first, second', [
+    ('skins/Ferrari_F1_Sponsored.png', 'skins/Ferrari_F1_Sponsored_v2.png'),
+    ('skins/racing_stripes_red.png', 'skins/racing_stripes_white.png'),
+])
+def test_variants_are_near_duplicates(index, first, second):
+    assert _distance(index, first, second) <= similarity.DUPLICATE_THRESHOLD
+
+
+@pytest.mark.parametrize('first, second', [
+    ('examples/Dot_Matrix.png', 'examples/Valentine.png'),
+    ('examples/Leopard.png', 'examples/Reindeer.png'),
+    ('examples/Camo.png', 'examples/Doge.png'),
+])
+def test_unrelated_designs_are_not(index, first, second):
+    assert _distance(index, first, second) > 2 * similarity.DUPLICATE_THRESHOLD
+
+
+def test_recolors_match_only_when_inverted(index):
+    first, second = 'skins/racing_stripes_red.png', 'skins/racing_stripes_white.png'
+    assert _distance(index, first, second, inverted=False) > similarity.DUPLICATE_THRESHOLD
+
+
+def test_flagged_pairs_are_the_variant_families(index):
+    flagged = {frozenset((first, second)) for _, first, second in index.duplicates()}
+    expected = {frozenset(f'skins/{name}.png' for name in pair) for pair in [
+        ('Ferrari_F1_Classic', 'Ferrari_F1_Sponsored'),
+        ('Ferrari_F1_Classic', 'Ferrari_F1_Racing'),
+        ('Ferrari_F1_Classic', 'Ferrari_F1_Sponsored_v2'),
+        ('Ferrari_F1_Racing', 'Ferrari_F1_Sponsored'),
+        ('Ferrari_F1_Sponsored', 'Ferrari_F1_Sponsored_v2'),
+        ('Ferrari_F1_Modern', 'Ferrari_F1_Sponsored_v2'),
+        ('matte_black', 'racing_stripes_red'),
+        ('matte_black', 'racing_stripes_white'),
+        ('racing_stripes_red', 'racing_stripes_white'),
+    ]}
+    assert flagged == expected
+
+
+def test_unchanged_files_are_not_hashed_again(index):
+    assert index.add(similarity.find_images(LIBRARY)) == 0
+
+
+def test_like_ranks_the_other_version_first(index):
+    ranked = index.similar_to(os.path.join(similarity.REPO_DIR, 'skins', 'Ferrari_F1_Sponsored.png'), k=3)
+    assert 'skins/Ferrari_F1_Sponsored_v2.png' in [path for _, path in ranked]
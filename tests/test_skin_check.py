@@ -0,0 +1,95 @@
+import os
+
+from PIL import Image
+import pytest
+
+import skin_check
+
+
+def _png(path, size=(512, 512)):
+    Image.new('RGBA', size, (10, 200, 30, 255)).save(path)
+    return str(path)
+
+
+def _problems(path):
+    return skin_check.check_skin(str(path))['problems']
+
+
+def test_valid_skin(tmp_path):
+    path = _png(tmp_path / 'ok.png', (1024, 768))
+    assert skin_check.read_header(path) == (1024, 768, 8, 6)
+    assert _problems(path) == []
+
+
+def test_truncated_file(tmp_path):
+    data = open(_png(tmp_path / 'full.png'), 'rb').read()
+    (tmp_path / 'short.png').write_bytes(data[:20])
+    with pytest.raises(ValueError, match='not a PNG'):
+        skin_check.read_header(str(tmp_path / 'short.png'))
+
+
+def test_not_a_png(tmp_path):
+    Image.new('RGB', (512, 512)).save(tmp_path / 'skin.png', 'JPEG')
+    assert _problems(tmp_path / 'skin.png') == ['not a PNG file']
+
+
+def test_bad_ihdr_crc(tmp_path):
+    path = _png(tmp_path / 'skin.png')
+    data = bytearray(open(path, 'rb').read())
+    # Claim a different width without fixing the CRC
+    data[18] ^= 0x01
+    (tmp_path / 'skin.png').write_bytes(bytes(data))
+    assert _problems(tmp_path / 'skin.png') == ['corrupt IHDR chunk (bad CRC)']
+
+
+@pytest.mark.parametrize('size, axis', [((256, 512), 'width'), ((512, 2048), 'height')])
+def test_size_out_of_range(tmp_path, size, axis):
+    problems = _problems(_png(tmp_path / 'skin.png', size))
+    assert len(problems) == 1 and problems[0].startswith(f'{axis} ')
+
+
+def test_over_byte_budget(tmp_path):
+    path = _png(tmp_path / 'skin.png')
+    with open(path, 'ab') as f:
+        f.write(b'\0' * (skin_check.MAX_BYTES + 1 - os.path.getsize(path)))
+    assert _problems(path) == [f'{skin_check.MAX_BYTES + 1:,} bytes is over the '
+                               f'{skin_check.MAX_BYTES:,} byte limit']
+
+
+def _library(folder, names):
+    folder.mkdir(parents=True)
+    return [_png(folder / name) for name in names]
+
+
+def test_package_respects_existing_wraps(tmp_path):
+    wraps = tmp_path / 'usb' / skin_check.WRAPS_DIR_NAME
+    _library(wraps, [f'old{i}.png' for i in range(8)])
+    _library(tmp_path / 'skins', [f'new{i}.png' for i in range(4)])
+
+    summary = skin_check.package([str(tmp_path / 'skins')], str(tmp_path / 'usb'))
+    assert [os.path.basename(c['path']) for c in summary['copied']] == ['new0.png', 'new1.png']
+    assert [os.path.basename(p) for p in summary['over_limit']] == ['new2.png', 'new3.png']
+    assert len(os.listdir(wraps)) == skin_check.MAX_FILES
+
+
+def test_package_replacing_same_name_frees_its_slot(tmp_path):
+    wraps = tmp_path / 'usb' / skin_check.WRAPS_DIR_NAME
+    _library(wraps, [f'skin{i}.png' for i in range(10)])
+    sources = _library(tmp_path / 'skins', ['skin0.png', 'skin1.png', 'extra.png'])
+
+    summary = skin_check.package([str(tmp_path / 'skins')], str(tmp_path / 'usb'))
+    # The two replacements fit; the new name would be an eleventh file
+    assert sorted(c['source'] for c in summary['copied']) == sorted(sources[:2])
+    assert summary['over_limit'] == [sources[2]]
+    assert len(os.listdir(wraps)) == skin_check.MAX_FILES
+
+
+def test_package_skips_invalid_and_verifies(tmp_path):
+    sources = _library(tmp_path / 'skins', ['good.png'])
+    _png(tmp_path / 'skins' / 'small.png', (100, 100))
+
+    summary = skin_check.package([str(tmp_path / 'skins')], str(tmp_path / 'usb'))
+    assert [r['path'] for r in summary['invalid']] == [str(tmp_path / 'skins' / 'small.png')]
+    (copied,) = summary['copied']
+    assert open(copied['path'], 'rb').read() == open(sources[0], 'rb').read()
+    assert os.listdir(tmp_path / 'usb' / skin_check.WRAPS_DIR_NAME) == ['good.png']
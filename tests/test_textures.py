@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+import textures
+
+
+@pytest.mark.parametrize('name', sorted(textures.TEXTURES))
+def test_same_seed_same_texture(name):
+    first = textures.texture((64, 48), name, seed=3)
+    second = textures.texture((64, 48), name, seed=3)
+    other = textures.texture((64, 48), name, seed=4)
+    np.testing.assert_array_equal(np.asarray(first), np.asarray(second))
+    assert not np.array_equal(np.asarray(first), np.asarray(other))
+
+
+@pytest.mark.parametrize('kwargs', [{'scale': 0}, {'scale': -1}, {'seed': -3}, {'seed': 1.5}])
+def test_bad_scale_or_seed_raises(kwargs):
+    with pytest.raises(ValueError):
+        textures.texture((32, 32), 'camo', **kwargs)